@@ -0,0 +1,51 @@
+#!/bin/sh
+# Runs the browse_products scenario headless against the WSGI server with the
+# sync API and the ASGI server with the async read paths, at the same worker
+# count, and prints the aggregated requests/s and latencies of each run.
+#
+#   DEBUG=False WORKERS=1 USERS=200 RUN_TIME=60s sh locust/compare_servers.sh
+#
+# Run it with DEBUG=False: silk and the debug toolbar otherwise dominate both
+# servers. One run on a single-CPU box shared with locust, SQLite and the
+# local-memory cache (2026-10-18, 200 users, 60s, one worker each):
+#
+#   wsgi   78.7 req/s  median 3ms  p95 56ms  failures 0
+#   asgi   78.6 req/s  median 6ms  p95 79ms  failures 1
+#
+# Throughput is bounded by the users' wait times, not by either server; at
+# this load the async views only add latency (the product list and detail
+# medians go from 3ms to 6ms): Django 5.0 has no async database drivers, so
+# each async ORM call still runs in a thread. The one asgi failure was a
+# keep-alive connection closed under the client, with no error on the server.
+set -eu
+
+WORKERS=${WORKERS:-1}
+USERS=${USERS:-200}
+SPAWN_RATE=${SPAWN_RATE:-20}
+RUN_TIME=${RUN_TIME:-60s}
+PORT=${PORT:-8090}
+OUT=${OUT:-$(mktemp -d)}
+
+mkdir -p "$OUT"
+
+run() {
+    name=$1 app=$2 worker_class=$3 read_api=$4
+    gunicorn --workers="$WORKERS" --worker-class "$worker_class" \
+        --bind "127.0.0.1:$PORT" --timeout 120 "$app" >"$OUT/$name.server.log" 2>&1 &
+    server=$!
+    sleep 3
+    STORE_READ_API=$read_api locust -f locust/browse_products.py --headless \
+        --host "http://127.0.0.1:$PORT" --users "$USERS" \
+        --spawn-rate "$SPAWN_RATE" --run-time "$RUN_TIME" \
+        --csv "$OUT/$name" --only-summary >/dev/null 2>&1 || true
+    kill "$server"
+    wait "$server" 2>/dev/null || true
+    printf '%-6s ' "$name"
+    awk -F, '$2 == "Aggregated" {
+        printf "%8.1f req/s  median %sms  p95 %sms  failures %s\n", $10, $5, $17, $4
+    }' "$OUT/${name}_stats.csv"
+}
+
+run wsgi storefront.wsgi:application sync /api/store
+run asgi storefront.asgi:application uvicorn_worker.UvicornWorker /api/store/async
+echo "CSV reports and server logs in $OUT"
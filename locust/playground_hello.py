@@ -1,7 +1,14 @@
-from locust import HttpUser, task
+from locust import HttpUser, between, task
+
+# With many users every request should still come back in about the upstream
+# delay on a cache miss and immediately afterwards: concurrent misses share
+# one httpbin call and no request blocks the worker while it is in flight.
+# Run against the ASGI server (Procfile web_asgi) to see the difference.
 
 
 class PlaygroundUser(HttpUser):
+    wait_time = between(0.5, 1)
+
     @task
     def say_hello(self):
-        self.client.get("/playground/hello/")
+        self.client.get("/api/playground/hello/")
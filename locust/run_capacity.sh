@@ -0,0 +1,23 @@
+#!/bin/sh
+# Headless step-load run of the store_load scenarios with CSV export. Seed
+# the database first so shoppers can log in:
+#
+#   python manage.py seed_store --scale medium
+#   HOST=http://127.0.0.1:8000 MAX_USERS=500 sh locust/run_capacity.sh
+#
+# <out>/store_stats_history.csv has requests/s and latency percentiles over
+# time, one plateau per step; capacity is the last step before they bend.
+set -eu
+
+HOST=${HOST:-http://127.0.0.1:8000}
+OUT=${OUT:-locust-results/$(date +%Y%m%d-%H%M%S)}
+
+mkdir -p "$OUT"
+LOAD_SHAPE=step locust -f locust/store_load.py --headless --host "$HOST" \
+    --csv "$OUT/store" --csv-full-history --html "$OUT/report.html" \
+    --only-summary
+
+awk -F, '$1 == "POST" && $2 ~ /\/store\/orders\// {
+    printf "%-32s %6d requests  median %sms  p95 %sms\n", $2, $3, $5, $17
+}' "$OUT/store_stats.csv"
+echo "CSV and HTML reports in $OUT"
@@ -0,0 +1,25 @@
+import os
+
+from locust import LoadTestShape
+
+
+class StepLoadShape(LoadTestShape):
+    """
+    Adds STEP_USERS users every STEP_SECONDS until MAX_USERS, then holds for
+    one more step and stops. Each plateau is long enough to read a steady
+    requests/s and latency off the CSV history, which shows where capacity
+    runs out.
+    """
+
+    step_users = int(os.environ.get("STEP_USERS", 25))
+    step_seconds = int(os.environ.get("STEP_SECONDS", 60))
+    max_users = int(os.environ.get("MAX_USERS", 250))
+    spawn_rate = float(os.environ.get("STEP_SPAWN_RATE", 10))
+
+    def tick(self):
+        run_time = self.get_run_time()
+        steps = self.max_users // self.step_users
+        if run_time >= (steps + 1) * self.step_seconds:
+            return None
+        step = min(int(run_time // self.step_seconds) + 1, steps)
+        return step * self.step_users, self.spawn_rate
@@ -0,0 +1,108 @@
+"""
+Settings and shared helpers for the store scenarios, read from the
+environment so one locustfile serves every run.
+"""
+
+import os
+import random
+from itertools import count
+
+from gevent.lock import Semaphore
+
+# point STORE_READ_API at /api/store/async to browse through the async read paths;
+# writes always go through the regular API
+API = os.environ.get("STORE_API", "/api/store")
+READ_API = os.environ.get("STORE_READ_API", API)
+AUTH_API = os.environ.get("STORE_AUTH_API", "/api/auth")
+
+# accounts created by `manage.py seed_store`
+CUSTOMER_PREFIX = os.environ.get("LOCUST_CUSTOMER_PREFIX", "seed-customer-")
+CUSTOMER_COUNT = int(os.environ.get("LOCUST_CUSTOMERS", 100))
+CUSTOMER_PASSWORD = os.environ.get("LOCUST_CUSTOMER_PASSWORD", "seed-password")
+
+# a staff account; the admin user class is left out without it
+ADMIN_USERNAME = os.environ.get("LOCUST_ADMIN_USERNAME", "")
+ADMIN_PASSWORD = os.environ.get("LOCUST_ADMIN_PASSWORD", "")
+
+# how many product list pages to read when discovering ids
+CATALOG_PAGES = int(os.environ.get("LOCUST_CATALOG_PAGES", 5))
+# shoppers put one of these in every cart so checkouts contend on inventory
+HOT_PRODUCTS = int(os.environ.get("LOCUST_HOT_PRODUCTS", 5))
+
+SEARCH_TERMS = ["classic", "coffee", "lamp", "modern", "organic", "watch"]
+ORDERINGS = ["unit_price", "-unit_price", "title", "-last_update"]
+
+_customer_numbers = count()
+
+
+def next_customer():
+    return f"{CUSTOMER_PREFIX}{next(_customer_numbers) % CUSTOMER_COUNT}"
+
+
+def login(client, username, password):
+    """
+    Gets a JWT from djoser and sends it with every later request of
+    ``client``. Returns whether it worked.
+    """
+    with client.post(
+        f"{AUTH_API}/jwt/create/",
+        json={"username": username, "password": password},
+        name="/auth/jwt/create",
+        catch_response=True,
+    ) as response:
+        if response.status_code != 200:
+            response.failure(f"login as {username} failed: {response.status_code}")
+            return False
+        client.headers["Authorization"] = f"JWT {response.json()['access']}"
+        return True
+
+
+class Catalog:
+    """
+    Collection and product ids read from the API once per process, so the
+    scenarios only ever ask for rows that exist.
+    """
+
+    collection_ids = []
+    product_ids = []
+    hot_product_ids = []
+    # users start together; only the first one reads the catalog
+    lock = Semaphore()
+
+    @classmethod
+    def load(cls, client):
+        with cls.lock:
+            if not cls.product_ids:
+                cls.read(client)
+
+    @classmethod
+    def read(cls, client):
+        response = client.get(f"{API}/collections/", name="/store/collections/")
+        cls.collection_ids = [row["id"] for row in response.json()]
+        product_ids, in_stock = [], []
+        for page in range(1, CATALOG_PAGES + 1):
+            response = client.get(
+                f"{API}/products/?page={page}", name="/store/products/?page"
+            )
+            if response.status_code != 200:
+                break
+            for row in response.json()["results"]:
+                product_ids.append(row["id"])
+                if row["inventory"] > 0:
+                    in_stock.append(row["id"])
+            if not response.json()["next"]:
+                break
+        cls.product_ids = product_ids
+        cls.hot_product_ids = in_stock[:HOT_PRODUCTS]
+
+    @classmethod
+    def collection_id(cls):
+        return random.choice(cls.collection_ids)
+
+    @classmethod
+    def product_id(cls):
+        return random.choice(cls.product_ids)
+
+    @classmethod
+    def hot_product_id(cls):
+        return random.choice(cls.hot_product_ids or cls.product_ids)
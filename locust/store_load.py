@@ -0,0 +1,19 @@
+"""
+Realistic mix of store traffic: anonymous browsing, signed-in shoppers
+checking out and, with LOCUST_ADMIN_USERNAME/PASSWORD set, staff editing
+products. Log-ins use the accounts `manage.py seed_store` creates.
+
+    locust -f locust/store_load.py --host http://127.0.0.1:8000
+
+Set LOAD_SHAPE=step to ramp up in steps (see step_load.py) instead of
+using --users, and run locust/run_capacity.sh for a headless run with CSV
+results.
+"""
+
+import os
+
+# locust runs every user class and the shape it finds in this module
+from store_users import AdminUser, BrowsingUser, ShoppingUser  # noqa: F401
+
+if os.environ.get("LOAD_SHAPE") == "step":
+    from step_load import StepLoadShape  # noqa: F401
@@ -0,0 +1,175 @@
+import random
+
+from locust import HttpUser, between, task
+from store_config import (
+    ADMIN_PASSWORD,
+    ADMIN_USERNAME,
+    API,
+    CUSTOMER_PASSWORD,
+    ORDERINGS,
+    READ_API,
+    SEARCH_TERMS,
+    Catalog,
+    login,
+    next_customer,
+)
+
+
+class BrowsingUser(HttpUser):
+    """
+    Anonymous visitor reading the catalog: filtered, searched and ordered
+    lists, product pages and their reviews.
+    """
+
+    weight = 6
+    wait_time = between(1, 4)
+
+    def on_start(self):
+        Catalog.load(self.client)
+
+    @task(4)
+    def list_collection(self):
+        self.client.get(
+            f"{READ_API}/products/?collection_id={Catalog.collection_id()}",
+            name="/store/products/?collection_id",
+        )
+
+    @task(2)
+    def list_price_range(self):
+        low = random.randrange(1, 500)
+        self.client.get(
+            f"{READ_API}/products/?unit_price__gt={low}&unit_price__lt={low + 100}"
+            f"&ordering={random.choice(ORDERINGS)}",
+            name="/store/products/?unit_price&ordering",
+        )
+
+    @task(2)
+    def search(self):
+        self.client.get(
+            f"{API}/products/?search={random.choice(SEARCH_TERMS)}",
+            name="/store/products/?search",
+        )
+
+    @task(1)
+    def autocomplete(self):
+        term = random.choice(SEARCH_TERMS)
+        self.client.get(
+            f"{API}/products/autocomplete/?q={term[:3]}",
+            name="/store/products/autocomplete",
+        )
+
+    @task(10)
+    def view_product(self):
+        self.client.get(
+            f"{READ_API}/products/{Catalog.product_id()}/", name="/store/products/:id"
+        )
+
+    @task(2)
+    def view_reviews(self):
+        self.client.get(
+            f"{READ_API}/products/{Catalog.product_id()}/reviews/",
+            name="/store/products/:id/reviews",
+        )
+
+
+class ShoppingUser(HttpUser):
+    """
+    Signed-in customer filling a cart and checking out. Every cart holds one
+    of the few hot products, so concurrent checkouts compete for the same
+    inventory; running out of stock is an expected answer, not a failure.
+    """
+
+    weight = 3
+    wait_time = between(2, 6)
+
+    def on_start(self):
+        Catalog.load(self.client)
+        login(self.client, next_customer(), CUSTOMER_PASSWORD)
+        self.new_cart()
+
+    def new_cart(self):
+        response = self.client.post(f"{API}/carts/", name="/store/carts/")
+        self.cart_id = response.json()["id"]
+
+    @task(5)
+    def add_item(self):
+        self.client.post(
+            f"{API}/carts/{self.cart_id}/items/",
+            json={"product_id": Catalog.product_id(), "quantity": 1},
+            name="/store/carts/:id/items",
+        )
+
+    @task(2)
+    def update_cart(self):
+        operations = [
+            {"op": "add", "product_id": Catalog.product_id(), "quantity": 1}
+            for _ in range(random.randint(1, 3))
+        ]
+        self.client.post(
+            f"{API}/carts/{self.cart_id}/items/batch/",
+            json={"operations": operations},
+            name="/store/carts/:id/items/batch",
+        )
+
+    @task(3)
+    def view_cart(self):
+        self.client.get(f"{API}/carts/{self.cart_id}/", name="/store/carts/:id")
+
+    @task(2)
+    def checkout(self):
+        self.client.post(
+            f"{API}/carts/{self.cart_id}/items/",
+            json={"product_id": Catalog.hot_product_id(), "quantity": 1},
+            name="/store/carts/:id/items",
+        )
+        with self.client.post(
+            f"{API}/orders/",
+            json={"cart_id": self.cart_id},
+            name="/store/orders/ (checkout)",
+            catch_response=True,
+        ) as response:
+            if response.status_code == 400 and "items" in response.json():
+                # lost the race for a hot product; tracked under its own name
+                response.request_meta["name"] = "/store/orders/ (out of stock)"
+                response.success()
+        self.new_cart()
+
+    @task(2)
+    def order_history(self):
+        self.client.get(f"{API}/orders/", name="/store/orders/")
+
+    @task(1)
+    def profile(self):
+        self.client.get(f"{API}/customers/me/", name="/store/customers/me")
+
+
+class AdminUser(HttpUser):
+    """
+    Staff member editing prices and restocking, which invalidates the
+    catalog caches the other users read through.
+    """
+
+    weight = 1
+    wait_time = between(5, 15)
+    # left out unless LOCUST_ADMIN_USERNAME/PASSWORD name a staff account
+    abstract = not ADMIN_USERNAME
+
+    def on_start(self):
+        Catalog.load(self.client)
+        login(self.client, ADMIN_USERNAME, ADMIN_PASSWORD)
+
+    @task(3)
+    def update_price(self):
+        self.client.patch(
+            f"{API}/products/{Catalog.product_id()}/",
+            json={"unit_price": f"{random.randrange(100, 100_000) / 100:.2f}"},
+            name="/store/products/:id (update)",
+        )
+
+    @task(1)
+    def restock(self):
+        self.client.patch(
+            f"{API}/products/{Catalog.hot_product_id()}/",
+            json={"inventory": random.randrange(50, 500)},
+            name="/store/products/:id (update)",
+        )
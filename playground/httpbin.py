@@ -0,0 +1,58 @@
+import asyncio
+from weakref import WeakKeyDictionary
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+
+from store.singleflight import aget_or_compute
+
+CACHE_TIMEOUT = 5 * 60
+
+# httpx clients and in-flight tasks are bound to the event loop that created
+# them. Under ASGI that is one loop per worker, so connections are pooled
+# across requests; under WSGI every request brings its own loop.
+_clients = WeakKeyDictionary()
+_inflight = WeakKeyDictionary()
+
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            base_url=settings.HTTPBIN_URL,
+            timeout=settings.HTTPBIN_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return client
+
+
+async def cached(key, fetch, timeout=CACHE_TIMEOUT):
+    """
+    Cache-aside read of ``key``. On a miss, concurrent callers in this process
+    share one task, and the tasks of all processes share the single-flight
+    lock, so only one ``fetch()`` hits the upstream at a time.
+    """
+    data = await cache.aget(key)
+    if data is not None:
+        return data
+
+    inflight = _inflight.setdefault(asyncio.get_running_loop(), {})
+    task = inflight.get(key)
+    if task is None:
+        task = inflight[key] = asyncio.ensure_future(
+            aget_or_compute(key, fetch, timeout, name="httpbin")
+        )
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    # a caller that goes away must not cancel the fetch the others wait on
+    return await asyncio.shield(task)
+
+
+async def delay(seconds):
+    async def fetch():
+        response = await get_client().get(f"/delay/{seconds}")
+        response.raise_for_status()
+        return response.json()
+
+    return await cached(f"playground:httpbin:delay:{seconds}", fetch)
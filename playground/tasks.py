@@ -1,15 +1,88 @@
-from time import sleep
+from itertools import islice
+from smtplib import SMTPException
 
-# from storefront.celery import celery
 from celery import shared_task
+from django.conf import settings
+from django.core import mail
+from templated_mail.mail import BaseEmailMessage
 
+from store.models import Customer
 
-# @celery.task
-@shared_task
-def notify_customers(message):
-    print(message)
-    sleep(10) # simulating a long-running task
-    print("video is ready")
+
+def render_notification(template_name, context):
+    """
+    Renders a templated email once as (subject, body, html); every recipient
+    of a campaign gets a copy of the same message.
+    """
+    message = BaseEmailMessage(template_name=template_name, context=context)
+    message.render()
+    return message.subject, message.body, message.html
+
+
+def build_messages(rendered, recipients):
+    subject, body, html = rendered
+    messages = []
+    for recipient in recipients:
+        message = mail.EmailMultiAlternatives(
+            subject, body, settings.DEFAULT_EMAIL_FROM, [recipient]
+        )
+        # same rules as BaseEmailMessage: html-only templates send html
+        if html and body != html:
+            message.attach_alternative(html, "text/html")
+        elif html:
+            message.content_subtype = "html"
+        messages.append(message)
+    return messages
+
+
+@shared_task(
+    bind=True,
+    rate_limit=settings.NOTIFICATION_RATE_LIMIT,
+    max_retries=5,
+    ignore_result=True,
+)
+def send_notification_batch(self, rendered, recipients):
+    """
+    Sends one message per recipient over a single SMTP connection. When a
+    send fails, only the recipients from that one on are retried, so nobody
+    before it is mailed twice.
+    """
+    messages = build_messages(rendered, recipients)
+    sent = 0
+    try:
+        with mail.get_connection() as connection:
+            for message in messages:
+                connection.send_messages([message])
+                sent += 1
+    except (SMTPException, OSError) as exc:
+        raise self.retry(
+            args=(rendered, recipients[sent:]),
+            exc=exc,
+            countdown=2**self.request.retries,
+        )
+    return sent
+
+
+@shared_task(ignore_result=True)
+def notify_customers(template_name, context=None, batch_size=None):
+    """
+    Emails ``template_name`` to every customer with an email address. The
+    template is rendered here once and the recipients are streamed from the
+    database into ``send_notification_batch`` tasks of ``batch_size``.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    rendered = render_notification(template_name, context or {})
+    recipients = (
+        Customer.objects.exclude(user__email="")
+        .order_by("pk")
+        .values_list("user__email", flat=True)
+        .iterator(chunk_size=batch_size)
+    )
+    batches = 0
+    while batch := list(islice(recipients, batch_size)):
+        send_notification_batch.delay(rendered, batch)
+        batches += 1
+    return batches
 
 
 @shared_task
@@ -0,0 +1,89 @@
+import socket
+from smtplib import SMTPException
+
+import pytest
+from aiosmtpd.controller import Controller
+from django.contrib.auth import get_user_model
+from django.core.mail.backends import locmem
+from model_bakery import baker
+
+from playground.tasks import notify_customers, send_notification_batch
+from storefront.celery import celeryApp
+
+
+class RecordingHandler:
+    """Keeps every message an aiosmtpd server receives, and its connection."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        self.sessions.add(id(session))
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(settings, monkeypatch):
+    handler = RecordingHandler()
+    server = Controller(handler, hostname="127.0.0.1", port=free_port())
+    server.start()
+    settings.EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+    settings.EMAIL_HOST, settings.EMAIL_PORT = server.hostname, server.port
+    settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ""
+    settings.EMAIL_USE_TLS = False
+    # batches run inline instead of going through the broker
+    monkeypatch.setattr(celeryApp.conf, "task_always_eager", True)
+    yield handler
+    server.stop()
+
+
+@pytest.mark.django_db
+def test_sends_each_batch_over_one_connection(smtp_server):
+    for n in range(5):
+        baker.make(get_user_model(), email=f"customer-{n}@example.com")
+    baker.make(get_user_model(), email="")
+
+    batches = notify_customers("emails/hello2.html", {"name": "Ada"}, batch_size=2)
+
+    assert batches == 3
+    assert sorted(message.rcpt_tos[0] for message in smtp_server.messages) == [
+        f"customer-{n}@example.com" for n in range(5)
+    ]
+    assert len(smtp_server.sessions) == 3
+    assert b"Hello Ada" in smtp_server.messages[0].original_content
+
+
+def test_retries_only_the_recipients_left_after_a_failure(mailoutbox, monkeypatch):
+    send_messages = locmem.EmailBackend.send_messages
+    failures = []
+
+    def fail_second_recipient_once(backend, messages):
+        if messages[0].to == ["b@example.com"] and not failures:
+            failures.append(messages[0].to)
+            raise SMTPException("mailbox unavailable")
+        return send_messages(backend, messages)
+
+    monkeypatch.setattr(
+        locmem.EmailBackend, "send_messages", fail_second_recipient_once
+    )
+    monkeypatch.setattr(celeryApp.conf, "task_always_eager", True)
+    rendered = ("Subject", "Body", None)
+
+    send_notification_batch.delay(
+        rendered, ["a@example.com", "b@example.com", "c@example.com"]
+    )
+
+    assert failures == [["b@example.com"]]
+    assert [message.to[0] for message in mailoutbox] == [
+        "a@example.com",
+        "b@example.com",
+        "c@example.com",
+    ]
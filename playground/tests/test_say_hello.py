@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncRequestFactory
+
+from playground.views import SayHelloView
+from store.singleflight import acquire, release
+
+
+class StubHttpbin(BaseHTTPRequestHandler):
+    """Answers /delay/<n> like httpbin, after ``server.delay`` seconds."""
+
+    def do_GET(self):
+        self.server.hits += 1
+        time.sleep(self.server.delay)
+        body = json.dumps({"url": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def httpbin(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHttpbin)
+    server.hits, server.delay = 0, 0.2
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.HTTPBIN_URL = f"http://127.0.0.1:{server.server_port}"
+    settings.HTTPBIN_TIMEOUT = 1.0
+    yield server
+    server.shutdown()
+    cache.clear()
+
+
+def say_hello(concurrency=1):
+    view = SayHelloView.as_view()
+
+    async def run():
+        requests = [AsyncRequestFactory().get("/api/playground/hello/")] * concurrency
+        return await asyncio.gather(*(view(request) for request in requests))
+
+    return async_to_sync(run)()
+
+
+def test_concurrent_misses_share_one_upstream_call(httpbin):
+    responses = say_hello(concurrency=20)
+
+    assert [response.status_code for response in responses] == [200] * 20
+    assert b"/delay/3" in responses[0].content
+    assert httpbin.hits == 1
+
+
+def test_waits_for_the_worker_holding_the_lock(httpbin):
+    key = "playground:httpbin:delay:3"
+    # another process is fetching: it holds the lock and fills the cache later
+    lock = acquire(f"{key}:lock")
+    timer = threading.Timer(0.2, cache.set, (key, {"url": "/delay/3?other"}))
+    timer.start()
+    try:
+        [response] = say_hello()
+    finally:
+        timer.join()
+        release(lock)
+
+    assert response.status_code == 200
+    assert b"/delay/3?other" in response.content
+    assert httpbin.hits == 0
+
+
+def test_later_requests_are_served_from_cache(httpbin):
+    say_hello()
+    [response] = say_hello()
+
+    assert response.status_code == 200
+    assert httpbin.hits == 1
+
+
+def test_slow_upstream_times_out_with_504(httpbin):
+    httpbin.delay = 2
+
+    [response] = say_hello()
+
+    assert response.status_code == 504
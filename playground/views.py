@@ -1,5 +1,6 @@
 import logging
 
+import httpx
 import requests
 from django.conf import settings
 from django.core.cache import cache
@@ -8,26 +9,29 @@ from django.core.mail import (BadHeaderError, EmailMessage, mail_admins,
 from django.http import HttpResponse
 from django.shortcuts import render
 from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.cache import cache_page
-from rest_framework.views import APIView
 from templated_mail.mail import BaseEmailMessage
 
+from . import httpbin
 from .tasks import notify_customers
 
 logger = logging.getLogger(__name__)
 
 
 # If we have class based views
-class SayHelloView(APIView):
-    # @method_decorator(cache_page(5 * 60))
-    def get(self, request):
+class SayHelloView(View):
+    async def get(self, request):
         try:
             logger.info("logging starts")
-            response = requests.get("https://httpbin.org/delay/3")
+            data = await httpbin.delay(3)
             logger.info("logging ends")
-            data = response.json()
-        except requests.ConnectionError:
-            logger.critical(" the httpbin is offline")
+        except httpx.TimeoutException:
+            logger.critical("the httpbin timed out")
+            return render(request, "hello.html", {"name": None}, status=504)
+        except httpx.HTTPError:
+            logger.critical("the httpbin is offline")
+            return render(request, "hello.html", {"name": None}, status=502)
         return render(request, "hello.html", {"name": data})
 
 
@@ -50,7 +54,7 @@ class SayHelloView(APIView):
 
 
 # def say_hello(request):
-#     notify_customers.delay("Your video is being processed")
+#     notify_customers.delay("emails/hello2.html", {"name": "Shankar"})
 #     return render(request, "hello.html", {"name": "Shankar"})
 
 
@@ -1,10 +1,12 @@
 from django.contrib import admin
+from django.db.models.functions import Now
 from unfold.admin import ModelAdmin
-from django.db.models import Count
 from django.urls import reverse
 from django.utils.html import format_html, urlencode
 
 from store import models
+from store.caching import (CATALOG, bump_version, collection_scope,
+                           expire_collections, product_scope, reference_cache)
 from store.models import (Address, Cart, CartItem, Collection, Customer, Order,
                           OrderItem, Product, ProductImage, Promotion)
 
@@ -20,12 +22,24 @@ class PromotionAdmin(ModelAdmin):
 
 @admin.register(Collection)
 class CollectionAdmin(ModelAdmin):
+    actions = ["refresh_cache"]
     list_display = ["title", "featured_product", "product_count"]
     list_per_page = 10
     search_fields = ["title"]
     autocomplete_fields = ["featured_product"]
 
-    @admin.display(description="Product Count")
+    @admin.action(description="Refresh cached collections")
+    def refresh_cache(self, request, queryset):
+        stats = reference_cache.stats()
+        expire_collections()
+        self.message_user(
+            request,
+            "Collection cache cleared in every process. This process had "
+            f"{stats['l1']['hits']} memory hits, {stats['l1']['misses']} misses; "
+            f"{stats['l2']['hits']} redis hits, {stats['l2']['misses']} misses.",
+        )
+
+    @admin.display(description="Product Count", ordering="product_count")
     def product_count(self, collection):
         url = (
             reverse("admin:store_product_changelist")
@@ -34,10 +48,6 @@ class CollectionAdmin(ModelAdmin):
         )
         return format_html('<a href="{}">{}</a>', url, collection.product_count)
 
-    # Modify the base queryset to include the product count:
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(product_count=Count("product"))
-
 
 class ProductImageInline(admin.TabularInline):
     model = models.ProductImage
@@ -79,7 +89,14 @@ class ProductAdmin(ModelAdmin):
 
     @admin.action(description="Clear inventory")
     def clear_inventory(self, request, queryset):
-        updated_count = queryset.update(inventory=0)
+        products = list(queryset.values_list("pk", "collection_id"))
+        # a bulk update skips the post_save handlers, so bump their scopes here
+        updated_count = queryset.update(inventory=0, last_update=Now())
+        bump_version(
+            CATALOG,
+            *{product_scope(pk) for pk, _ in products},
+            *{collection_scope(collection_id) for _, collection_id in products},
+        )
         self.message_user(
             request, f"{updated_count} products were successfully updated."
         )
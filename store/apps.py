@@ -8,3 +8,8 @@ class StoreConfig(AppConfig):
     #override this method and import signal
     def ready(self):
         import store.signals.handlers
+        from django.db.backends.signals import connection_created
+
+        from store.metrics import install_query_recorder
+
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,138 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from store.caching import (
+    CACHE_TIMEOUT,
+    get_collections,
+    product_detail_key,
+    product_list_key,
+)
+from store.metrics import record_cache
+from store.models import Product, Review
+from store.renderers import ORJSONRenderer
+from store.serializers import (
+    CartSerializer,
+    CollectionSerializer,
+    FastProductSerializer,
+    ReviewSerializer,
+)
+from store.views import CartViewSet, ProductViewSet
+
+renderer = ORJSONRenderer()
+
+
+def render(data, status=200):
+    return HttpResponse(
+        renderer.render(data), status=status, content_type=renderer.media_type
+    )
+
+
+def not_found(detail="Not found."):
+    return render({"detail": detail}, status=404)
+
+
+async def to_list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def represent_products(request, rows):
+    serializer = FastProductSerializer(context={"request": request})
+    images = serializer.group_images(
+        await to_list(serializer.get_images_queryset([row["id"] for row in rows]))
+    )
+    return [serializer.represent(row, images.get(row["id"], [])) for row in rows]
+
+
+def list_view(request):
+    # ProductViewSet's filters and paginator, so the async list takes the
+    # same parameters, cursor included, and rejects the same ones
+    return ProductViewSet(
+        request=Request(request), action="list", format_kwarg=None, kwargs={}
+    )
+
+
+@require_GET
+async def product_list(request):
+    """
+    Async counterpart of ``ProductViewSet.list`` with the same filters,
+    pagination, cache keys and output.
+    """
+    key = await sync_to_async(product_list_key)(request)
+    data = await cache.aget(key)
+    record_cache("response", "l2", data is not None)
+    if data is not None:
+        return render(data)
+
+    view = list_view(request)
+    try:
+        # only validating a collection_id looks the collection up here; the
+        # count and the page are read with the async ORM
+        queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+        rows = await view.paginator.apaginate_queryset(queryset, view.request, view)
+    except APIException as exc:
+        detail = exc.detail
+        if not isinstance(detail, (dict, list)):
+            detail = {"detail": detail}
+        return render(detail, status=exc.status_code)
+    data = view.paginator.get_paginated_response(
+        await represent_products(request, rows)
+    ).data
+    await cache.aset(key, data, CACHE_TIMEOUT)
+    return render(data)
+
+
+@require_GET
+async def product_detail(request, id):
+    key = await sync_to_async(product_detail_key)(request, id)
+    data = await cache.aget(key)
+    record_cache("response", "l2", data is not None)
+    if data is not None:
+        return render(data)
+
+    row = (
+        await Product.objects.filter(id=id)
+        .values(*FastProductSerializer.values_fields)
+        .afirst()
+    )
+    if row is None:
+        return not_found("No Product matches the given query.")
+    [data] = await represent_products(request, [row])
+    await cache.aset(key, data, CACHE_TIMEOUT)
+    return render(data)
+
+
+@require_GET
+async def collection_list(request):
+    collections = await sync_to_async(get_collections)()
+    return render(
+        CollectionSerializer(
+            list(collections.values()), many=True, context={"request": request}
+        ).data
+    )
+
+
+@require_GET
+async def collection_detail(request, pk):
+    collections = await sync_to_async(get_collections)()
+    collection = collections.get(int(pk))
+    if collection is None:
+        return not_found("No Collection matches the given query.")
+    return render(CollectionSerializer(collection, context={"request": request}).data)
+
+
+@require_GET
+async def cart_detail(request, id):
+    cart = await CartViewSet.queryset.filter(id=id).afirst()
+    if cart is None:
+        return not_found("No Cart matches the given query.")
+    return render(CartSerializer(cart).data)
+
+
+@require_GET
+async def review_list(request, product_id):
+    reviews = await to_list(Review.objects.filter(product_id=product_id))
+    return render(ReviewSerializer(reviews, many=True).data)
@@ -0,0 +1,339 @@
+import time
+from abc import ABC, abstractmethod
+from functools import partial
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from store.metrics import record_cache
+from store.models import Collection
+from store.singleflight import StaleCopy, get_or_compute
+from store.tiered_cache import TieredCache
+
+CACHE_TIMEOUT = 15 * 60
+VERSION_TIMEOUT = None
+
+CATALOG = "catalog"
+COLLECTIONS = "collections"
+
+# small, rarely changing rows read on most requests
+reference_cache = TieredCache("reference", l2_timeout=CACHE_TIMEOUT)
+
+
+def product_scope(product_id):
+    return f"product:{product_id}"
+
+
+def collection_scope(collection_id):
+    return f"collection:{collection_id}"
+
+
+def _version_key(scope):
+    return f"store:version:{scope}"
+
+
+def _since_key(scope):
+    return f"{_version_key(scope)}:since"
+
+
+def _date_version(scope, version):
+    # kept next to the counter and just as long, so it only moves with it
+    since = (version, timezone.now())
+    cache.set(_since_key(scope), since, VERSION_TIMEOUT)
+    return since
+
+
+def get_version(scope):
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version that was evicted from redis can
+        # never come back lower than one that is still referenced by a key.
+        if cache.add(key, time.time_ns(), VERSION_TIMEOUT):
+            _date_version(scope, cache.get(key))
+        version = cache.get(key)
+    return version
+
+
+def get_version_state(scope):
+    """
+    The version of ``scope`` and when it was set. Every write under the
+    scope, deletions included, bumps the version, so together they date the
+    last change to anything in it.
+    """
+    version = get_version(scope)
+    since = cache.get(_since_key(scope))
+    if since is None or since[0] != version:
+        # evicted, or the version was expired rather than bumped
+        since = _date_version(scope, version)
+    return {"version": version, "last_modified": since[1]}
+
+
+def bump_version(*scopes):
+    # Deferred until the writer commits: bumped any earlier, a concurrent
+    # read could cache the old rows under the new version for a full TTL.
+    # Outside a transaction it runs right away.
+    transaction.on_commit(partial(_bump_versions, scopes))
+
+
+def _bump_versions(scopes):
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            version = time.time_ns()
+            cache.set(key, version, VERSION_TIMEOUT)
+        _date_version(scope, version)
+
+
+def expire_versions(*scopes):
+    """
+    Invalidates many scopes in one round trip. Dropped versions are reseeded
+    from the clock, which is always ahead of a counter that was incremented.
+    Like ``bump_version`` it waits for the surrounding transaction to commit.
+    """
+    keys = [_version_key(scope) for scope in scopes]
+    transaction.on_commit(partial(cache.delete_many, keys))
+
+
+def get_collections():
+    """
+    Every collection by id, served from process memory when it is warm.
+    """
+    return reference_cache.get_or_set(
+        COLLECTIONS,
+        lambda: {collection.pk: collection for collection in Collection.objects.all()},
+    )
+
+
+def expire_collections():
+    reference_cache.delete(COLLECTIONS)
+
+
+def _request_digest(request):
+    return md5(request.build_absolute_uri().encode()).hexdigest()
+
+
+def product_list_scope(request):
+    # GET rather than query_params so plain Django requests work too
+    collection_id = request.GET.get("collection_id")
+    if collection_id and collection_id.isdigit():
+        return collection_scope(collection_id)
+    return CATALOG
+
+
+def product_list_key(request):
+    scope = product_list_scope(request)
+    return (
+        f"store:products:list:{scope}:{get_version(scope)}:{_request_digest(request)}"
+    )
+
+
+def product_detail_key(request, product_id):
+    scope = product_scope(product_id)
+    return f"store:products:detail:{get_version(scope)}:{_request_digest(request)}"
+
+
+def product_detail_stale_key(request, product_id):
+    # outlives version bumps, so waiters on a recompute get the last copy
+    return f"store:products:detail:stale:{product_id}:{_request_digest(request)}"
+
+
+def autocomplete_key(request):
+    return (
+        f"store:products:autocomplete:{get_version(CATALOG)}:{_request_digest(request)}"
+    )
+
+
+def facets_key(request):
+    return f"store:products:facets:{get_version(CATALOG)}:{_request_digest(request)}"
+
+
+class VersionedCacheMixin(ABC):
+    """
+    Read-through cache for list and retrieve.
+
+    Cache keys embed a version counter that signal handlers bump whenever the
+    underlying rows change, so stale entries are never read again and simply
+    age out of redis. Views provide the keys, usually from one of the
+    ``*_key`` functions above.
+    """
+
+    cache_timeout = CACHE_TIMEOUT
+
+    @abstractmethod
+    def get_list_cache_key(self, request):
+        pass
+
+    @abstractmethod
+    def get_detail_cache_key(self, request, *args, **kwargs):
+        pass
+
+    def get_list_stale_cache_key(self, request):
+        return None
+
+    def get_detail_stale_cache_key(self, request, *args, **kwargs):
+        return None
+
+    def cached_response(self, key, stale_key, view, request, *args, **kwargs):
+        response = None
+
+        def compute():
+            nonlocal response
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                return response.data
+            return None
+
+        # one worker renders a missing entry while the others wait for it
+        data = get_or_compute(
+            key, compute, self.cache_timeout, stale_key, mark_stale=True
+        )
+        if response is not None:
+            return response
+        if isinstance(data, StaleCopy):
+            response = Response(data.value)
+            # rendered from an older version; see ConditionalGetMixin
+            response.stale_copy = True
+            return response
+        return Response(data)
+
+    def cached_validator_state(self, key, compute, *args, **kwargs):
+        # lets ConditionalGetMixin answer cache hits without a query
+        key = f"{key}:validators"
+        state = cache.get(key)
+        record_cache("validators", "l2", state is not None)
+        if state is None:
+            state = compute(*args, **kwargs)
+            if state is not None:
+                cache.set(key, state, self.cache_timeout)
+        return state
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            self.get_list_cache_key(request),
+            self.get_list_stale_cache_key(request),
+            super().list,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            self.get_detail_cache_key(request, *args, **kwargs),
+            self.get_detail_stale_cache_key(request, *args, **kwargs),
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified for list and retrieve.
+
+    Detail validators come from one aggregate over the row behind the
+    response (newest ``last_modified_field``, highest id and row count).
+    Lists use the version of ``get_list_version_scope()``, since the rows
+    left after a deletion cannot tell when it happened; lists without a
+    scope fall back to the aggregate for the ETag and send no Last-Modified.
+    Matching ``If-None-Match``/``If-Modified-Since`` requests get a 304
+    before anything is fetched or serialized. Place it before
+    ``VersionedCacheMixin`` so cache hits are answered the same way.
+    """
+
+    last_modified_field = "last_update"
+
+    def get_validator_state(self, queryset):
+        return queryset.aggregate(
+            last_modified=Max(self.last_modified_field),
+            max_id=Max("pk"),
+            count=Count("pk"),
+        )
+
+    def get_list_version_scope(self, request):
+        return None
+
+    def get_list_validator_state(self, request):
+        scope = self.get_list_version_scope(request)
+        if scope is not None:
+            return get_version_state(scope)
+        state = self.get_validator_state(self.filter_queryset(self.get_queryset()))
+        # still part of the ETag, but not a date the list last changed
+        state["newest"] = state.pop("last_modified")
+        return state
+
+    def get_detail_validator_state(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        state = self.get_validator_state(queryset)
+        return state if state["count"] else None
+
+    def conditional_response(self, state, view, request, *args, **kwargs):
+        if state is None:
+            # nothing to validate against; let the view answer, usually 404
+            return view(request, *args, **kwargs)
+        last_modified = state.get("last_modified")
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        # the same rows render differently per page, filter and media type
+        fingerprint = ":".join(
+            str(value)
+            for value in (
+                request.get_full_path(),
+                request.accepted_media_type,
+                *state.values(),
+            )
+        )
+        etag = quote_etag(md5(fingerprint.encode()).hexdigest())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if getattr(response, "stale_copy", False):
+                # the validators describe the current rows, not this body, and
+                # would keep revalidating the old copy with 304s
+                patch_cache_control(response, no_store=True)
+                return response
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_validator_state(request),
+            super().list,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_detail_validator_state(request, *args, **kwargs),
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
@@ -0,0 +1,284 @@
+import csv
+from itertools import islice
+
+import orjson
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from store.caching import (
+    CATALOG,
+    collection_scope,
+    expire_collections,
+    expire_versions,
+    product_scope,
+)
+from store.models import Collection, Product, ProductFacet
+from store.renderers import default
+from store.search import index_products
+
+CSV = "csv"
+NDJSON = "ndjson"
+FORMATS = (CSV, NDJSON)
+CONTENT_TYPES = {CSV: "text/csv", NDJSON: "application/x-ndjson"}
+
+FIELDS = ["slug", "title", "description", "unit_price", "inventory", "collection"]
+UPDATE_FIELDS = [
+    "title",
+    "description",
+    "unit_price",
+    "inventory",
+    "collection",
+    "last_update",
+]
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+
+
+def read_rows(lines, file_format):
+    """
+    Yields ``(line number, row dict)`` from an iterable of text lines.
+    """
+    if file_format == CSV:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == NDJSON:
+        for line_num, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                yield line_num, exc
+                continue
+            yield line_num, row
+    else:
+        raise ValueError(f"Unsupported format {file_format!r}")
+
+
+class CollectionResolver:
+    """
+    Maps the ``collection`` column, an id or a title, to a collection id.
+    Unknown titles create the collection, unknown ids are an error.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.titles = {}
+
+    def resolve(self, value):
+        value = str(value if value is not None else "").strip()
+        if not value:
+            raise ValidationError({"collection": ["This field cannot be blank."]})
+        if value.isdigit():
+            collection_id = int(value)
+            if collection_id not in self.ids:
+                if not Collection.objects.filter(pk=collection_id).exists():
+                    raise ValidationError(
+                        {"collection": [f"Collection {collection_id} does not exist."]}
+                    )
+                self.ids.add(collection_id)
+            return collection_id
+        if value not in self.titles:
+            collection = Collection.objects.filter(title=value).first()
+            if collection is None:
+                collection = Collection.objects.create(title=value)
+            self.titles[value] = collection.pk
+        return self.titles[value]
+
+
+def slug_taken(slug):
+    return ValidationError(
+        {
+            "slug": [
+                f"Slug {slug!r} is already used by another row of this "
+                "import; give the product its own slug."
+            ]
+        }
+    )
+
+
+class SlugTracker:
+    """
+    Remembers the slugs of the current batch and whether they were generated
+    from a title. Two rows sharing a generated slug are most likely two
+    products with the same title, so the later one is rejected rather than
+    upserted over the first; rows with explicit slugs still let the last one
+    win.
+
+    Earlier batches are not kept in memory, so a file of any length imports
+    in constant memory. Instead, a generated slug is looked up among the
+    products this import has already written, the ones updated since it
+    started.
+    """
+
+    def __init__(self):
+        self.started = timezone.now()
+        self.generated = {}
+
+    def add(self, slug, generated):
+        previous = self.generated.get(slug)
+        if previous is not None and (previous or generated):
+            raise slug_taken(slug)
+        self.generated[slug] = generated
+
+    def reject_written(self, batch, report):
+        """
+        Drops the rows of ``batch`` whose generated slug an earlier batch
+        already upserted, then forgets the batch.
+        """
+        generated = [slug for slug in batch if self.generated.get(slug)]
+        if generated:
+            written = Product.objects.filter(
+                slug__in=generated, last_update__gte=self.started
+            ).values_list("slug", flat=True)
+            for slug in written:
+                line_num, _ = batch.pop(slug)
+                report.add_error(line_num, slug_taken(slug))
+        self.generated = {}
+
+
+def build_product(row, collections, slugs):
+    if not isinstance(row, dict):
+        raise ValidationError(f"Expected an object, got {type(row).__name__}")
+    title = str(row.get("title") or "").strip()
+    slug = str(row.get("slug") or "").strip()
+    product = Product(
+        title=title,
+        slug=slug or slugify(title),
+        description=row.get("description") or "",
+        unit_price=row.get("unit_price"),
+        inventory=row.get("inventory"),
+        collection_id=collections.resolve(row.get("collection")),
+    )
+    # converts the raw strings and runs the model validators; uniqueness is
+    # what the upsert is for
+    product.clean_fields(exclude=["collection", "last_update"])
+    slugs.add(product.slug, generated=not slug)
+    return product
+
+
+class ImportReport:
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.upserted = 0
+        self.error_count = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, line_num, error):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            if isinstance(error, ValidationError):
+                messages = (
+                    error.message_dict
+                    if hasattr(error, "error_dict")
+                    else {"non_field_errors": error.messages}
+                )
+            else:
+                messages = {"non_field_errors": [str(error)]}
+            self.errors.append({"line": line_num, "errors": messages})
+
+    def as_dict(self):
+        return {
+            "upserted": self.upserted,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def upsert_batch(batch, report):
+    """
+    Upserts ``batch``, a dict of slug -> (line number, product), on the slug
+    and refreshes what the skipped model signals would have.
+    """
+    try:
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                [product for _, product in batch.values()],
+                update_conflicts=True,
+                unique_fields=["slug"],
+                update_fields=UPDATE_FIELDS,
+            )
+    except DatabaseError as exc:
+        for line_num, _ in batch.values():
+            report.add_error(line_num, exc)
+        return
+    report.upserted += len(batch)
+    product_ids = list(
+        Product.objects.filter(slug__in=list(batch)).values_list("id", flat=True)
+    )
+    index_products(product_ids)
+    expire_versions(*[product_scope(product_id) for product_id in product_ids])
+
+
+def import_products(lines, file_format=CSV, batch_size=BATCH_SIZE):
+    """
+    Upserts products from an iterable of CSV or NDJSON text lines in batches
+    of ``batch_size`` and returns an ``ImportReport``. Invalid rows are
+    reported by line number and skipped.
+    """
+    report = ImportReport()
+    collections = CollectionResolver()
+    slugs = SlugTracker()
+    batch = {}
+    for line_num, row in read_rows(lines, file_format):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            product = build_product(row, collections, slugs)
+        except (ValidationError, ValueError) as exc:
+            report.add_error(line_num, exc)
+            continue
+        # a slug repeated within one batch would hit the same row twice in
+        # one statement, which PostgreSQL rejects; the last one wins anyway
+        batch[product.slug] = (line_num, product)
+        if len(batch) >= batch_size:
+            slugs.reject_written(batch, report)
+            upsert_batch(batch, report)
+            batch = {}
+    if batch:
+        slugs.reject_written(batch, report)
+        upsert_batch(batch, report)
+
+    if report.upserted:
+        Collection.objects.reconcile_product_counts()
+        ProductFacet.objects.rebuild()
+        expire_collections()
+        expire_versions(
+            CATALOG,
+            *[
+                collection_scope(collection_id)
+                for collection_id in Collection.objects.values_list("id", flat=True)
+            ],
+        )
+    return report
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_products(file_format=CSV, chunk_size=CHUNK_SIZE):
+    """
+    Yields the catalog as CSV or NDJSON text, ``chunk_size`` products at a
+    time, reading it with a server-side cursor where the database has one.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format {file_format!r}")
+    rows = Product.objects.order_by("id").values_list(*FIELDS).iterator(chunk_size)
+    if file_format == CSV:
+        writer = csv.writer(Echo())
+        yield writer.writerow(FIELDS)
+        encode = writer.writerow
+    else:
+
+        def encode(row):
+            return orjson.dumps(dict(zip(FIELDS, row)), default=default).decode() + "\n"
+
+    while chunk := list(islice(rows, chunk_size)):
+        yield "".join(encode(row) for row in chunk)
@@ -0,0 +1,129 @@
+from django.db.models import Count, Q, Sum
+
+from store.caching import get_collections
+from store.models import (
+    PRICE_BUCKET_EDGES,
+    Product,
+    ProductFacet,
+    price_bucket_expression,
+)
+
+
+def bucket_bounds(bucket):
+    low = PRICE_BUCKET_EDGES[bucket]
+    high = (
+        PRICE_BUCKET_EDGES[bucket + 1] if bucket + 1 < len(PRICE_BUCKET_EDGES) else None
+    )
+    return low, high
+
+
+def price_filter(price_gt, price_lt):
+    condition = Q()
+    if price_gt is not None:
+        condition &= Q(unit_price__gt=price_gt)
+    if price_lt is not None:
+        condition &= Q(unit_price__lt=price_lt)
+    return condition
+
+
+def inside_buckets(price_gt, price_lt):
+    """
+    The buckets entirely within the price range, which the facet table can
+    count; they are always consecutive.
+    """
+    return [
+        bucket
+        for bucket, (low, high) in enumerate(
+            map(bucket_bounds, range(len(PRICE_BUCKET_EDGES)))
+        )
+        if (price_gt is None or low > price_gt)
+        and (price_lt is None or (high is not None and high <= price_lt))
+    ]
+
+
+def collection_counts_from_table(price_gt, price_lt):
+    if price_gt is None and price_lt is None:
+        cells = ProductFacet.objects.all()
+        counts = {}
+    else:
+        inside = inside_buckets(price_gt, price_lt)
+        cells = ProductFacet.objects.filter(price_bucket__in=inside)
+        # products in the buckets the range cuts through are counted live
+        products = Product.objects.filter(price_filter(price_gt, price_lt))
+        if inside:
+            low, _ = bucket_bounds(inside[0])
+            _, high = bucket_bounds(inside[-1])
+            products = products.exclude(price_filter(low, high) | Q(unit_price=low))
+        counts = live_counts(products, "collection_id")
+    for collection_id, count in (
+        cells.order_by()
+        .values("collection_id")
+        .annotate(count=Sum("product_count"))
+        .values_list("collection_id", "count")
+    ):
+        counts[collection_id] = counts.get(collection_id, 0) + count
+    return counts
+
+
+def bucket_counts_from_table(collection_id):
+    cells = ProductFacet.objects.order_by()
+    if collection_id is not None:
+        cells = cells.filter(collection_id=collection_id)
+    return dict(
+        cells.values("price_bucket")
+        .annotate(count=Sum("product_count"))
+        .values_list("price_bucket", "count")
+    )
+
+
+def live_counts(queryset, group_by):
+    return dict(
+        queryset.order_by()
+        .values(group_by)
+        .annotate(count=Count("pk"))
+        .values_list(group_by, "count")
+    )
+
+
+def product_facets(collection_id=None, price_gt=None, price_lt=None, search=None):
+    """
+    Product counts per collection and per price bucket for a product list
+    filtered by collection, price range and ``search``, a function that
+    narrows a product queryset.
+
+    Each facet ignores its own filter, so the counts show what picking
+    another collection or price bucket would return. Without a search they
+    come from ``ProductFacet``; a search can only be counted live.
+    """
+    if search is None:
+        collection_counts = collection_counts_from_table(price_gt, price_lt)
+        bucket_counts = bucket_counts_from_table(collection_id)
+    else:
+        products = Product.objects.all()
+        collection_counts = live_counts(
+            search(products.filter(price_filter(price_gt, price_lt))),
+            "collection_id",
+        )
+        if collection_id is not None:
+            products = products.filter(collection_id=collection_id)
+        bucket_counts = live_counts(
+            search(products).annotate(bucket=price_bucket_expression()), "bucket"
+        )
+
+    return {
+        "collections": [
+            {
+                "id": collection.pk,
+                "title": collection.title,
+                "count": collection_counts[collection.pk],
+            }
+            for collection in get_collections().values()
+            if collection_counts.get(collection.pk)
+        ],
+        "price_buckets": [
+            {"min": low, "max": high, "count": bucket_counts.get(bucket, 0)}
+            for bucket, (low, high) in enumerate(
+                map(bucket_bounds, range(len(PRICE_BUCKET_EDGES)))
+            )
+        ],
+    }
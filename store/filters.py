@@ -1,6 +1,8 @@
 from django_filters.rest_framework import FilterSet
+from rest_framework.filters import SearchFilter
 
 from .models import Product
+from .search import search_products
 
 
 class ProductFilter(FilterSet):
@@ -10,3 +12,20 @@ class ProductFilter(FilterSet):
             "collection_id": ["exact"],
             "unit_price": ["gt", "lt"],
         }
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    Full-text search through the database's search backend, ranked by
+    relevance unless an explicit ordering is requested. Falls back to
+    ``SearchFilter``'s icontains lookups where no backend exists.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        results = search_products(queryset, " ".join(search_terms))
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        return results.order_by("-search_rank", "-id")
@@ -0,0 +1,125 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+
+from store.models import Cart, CartItem, Collection, Customer, Order, OrderItem, Product
+from store.serializers import CreateOrderSerializer, OutOfStock
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs parallel checkouts of one hot product and verifies inventory is "
+        "never oversold. Point it at PostgreSQL for meaningful numbers; SQLite "
+        "serializes every writer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--checkouts", type=int, default=400)
+        parser.add_argument("--inventory", type=int, default=250)
+        parser.add_argument("--quantity", type=int, default=1)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated rows."
+        )
+
+    def handle(self, *args, **options):
+        run = uuid4().hex[:8]
+        collection = Collection.objects.create(title=f"benchmark-{run}")
+        product = Product.objects.create(
+            title=f"Hot product {run}",
+            slug=f"benchmark-hot-product-{run}",
+            description="",
+            unit_price=10,
+            inventory=options["inventory"],
+            collection=collection,
+        )
+        users = [
+            get_user_model().objects.create(
+                username=f"benchmark-{run}-{n}",
+                email=f"benchmark-{run}-{n}@example.com",
+            )
+            for n in range(options["workers"])
+        ]
+
+        cart_ids = []
+
+        def checkout(n):
+            user = users[n % len(users)]
+            try:
+                cart = Cart.objects.create()
+                cart_ids.append(cart.id)
+                CartItem.objects.add(cart.id, product.id, options["quantity"])
+                serializer = CreateOrderSerializer(
+                    data={"cart_id": cart.id}, context={"user_id": user.id}
+                )
+                serializer.is_valid(raise_exception=True)
+                started = time.perf_counter()
+                serializer.save()
+                return "placed", time.perf_counter() - started
+            except OutOfStock:
+                return "out_of_stock", None
+            except OperationalError:
+                return "error", None
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            results = list(executor.map(checkout, range(options["checkouts"])))
+        elapsed = time.perf_counter() - started
+
+        outcomes = {"placed": 0, "out_of_stock": 0, "error": 0}
+        latencies = sorted(latency for _, latency in results if latency is not None)
+        for outcome, _ in results:
+            outcomes[outcome] += 1
+
+        product.refresh_from_db()
+        ordered = (
+            OrderItem.objects.filter(product=product).aggregate(total=Sum("quantity"))[
+                "total"
+            ]
+            or 0
+        )
+
+        self.stdout.write(f"database:      {connection.vendor}")
+        self.stdout.write(
+            f"checkouts:     {options['checkouts']} over {options['workers']} workers"
+        )
+        self.stdout.write(
+            f"elapsed:       {elapsed:.2f}s ({len(results) / elapsed:.1f}/s)"
+        )
+        for outcome, count in outcomes.items():
+            self.stdout.write(f"{outcome + ':':<15}{count}")
+        if latencies:
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(f"save p50/p99:  {p50 * 1000:.1f}ms / {p99 * 1000:.1f}ms")
+        self.stdout.write(
+            f"inventory:     {options['inventory']} -> {product.inventory}"
+        )
+        self.stdout.write(f"units ordered: {ordered}")
+
+        consistent = (
+            product.inventory >= 0
+            and ordered == options["inventory"] - product.inventory
+            and ordered == outcomes["placed"] * options["quantity"]
+        )
+
+        if not options["keep"]:
+            orders = Order.objects.filter(customer__user__in=users)
+            OrderItem.objects.filter(order__in=orders).delete()
+            orders.delete()
+            Customer.objects.filter(user__in=users).delete()
+            get_user_model().objects.filter(pk__in=[user.pk for user in users]).delete()
+            Cart.objects.filter(pk__in=cart_ids).delete()
+            product.delete()
+            collection.delete()
+
+        if not consistent:
+            raise CommandError("Inventory and ordered quantities disagree: oversold")
+        self.stdout.write(self.style.SUCCESS("No overselling"))
@@ -0,0 +1,81 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from model_bakery import baker
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from store.models import Cart, CartItem, Collection, Product, ProductImage
+from store.renderers import MessagePackRenderer, ORJSONRenderer
+from store.serializers import CartSerializer, FastProductSerializer
+from store.views import CartViewSet
+
+RENDERERS = {
+    "json": JSONRenderer,
+    "orjson": ORJSONRenderer,
+    "msgpack": MessagePackRenderer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares render time and payload size of the stock JSON renderer, "
+        "orjson and MessagePack on a product list page and a full cart. Rows "
+        "are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--cart-items", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            payloads = self.make_payloads(options)
+            for name, data in payloads.items():
+                self.stdout.write(name)
+                baseline = None
+                for label, renderer_class in RENDERERS.items():
+                    renderer = renderer_class()
+                    content = renderer.render(data)
+                    best = min(
+                        timeit.repeat(
+                            lambda: renderer.render(data),
+                            number=1,
+                            repeat=options["repeat"],
+                        )
+                    )
+                    baseline = baseline or best
+                    self.stdout.write(
+                        f"  {label:<10}{best * 1e3:>8.3f} ms"
+                        f"{baseline / best:>7.1f}x{len(content):>10} bytes"
+                    )
+            transaction.set_rollback(True)
+
+    def make_payloads(self, options):
+        collection = baker.make(Collection)
+        products = baker.make(
+            Product,
+            collection=collection,
+            unit_price="19.99",
+            _quantity=max(options["page_size"], options["cart_items"]),
+        )
+        for product in products:
+            baker.make(ProductImage, product=product, image="store/images/a.jpg")
+        context = {"request": APIRequestFactory().get("/api/store/products/")}
+        rows = Product.objects.filter(
+            id__in=[product.id for product in products[: options["page_size"]]]
+        ).values(*FastProductSerializer.values_fields)
+        product_page = FastProductSerializer(rows, many=True, context=context).data
+
+        cart = Cart.objects.create()
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product=product, quantity=n % 5 + 1)
+            for n, product in enumerate(products[: options["cart_items"]])
+        )
+        cart = CartViewSet.queryset.get(pk=cart.pk)
+        return {
+            f"product list ({options['page_size']} products)": product_page,
+            f"cart ({options['cart_items']} items)": CartSerializer(cart).data,
+        }
@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from store.profiling import clear_stacks, load_stacks
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the stacks collected by SamplingProfilerMiddleware as collapsed "
+        "stacks, one file per route, ready for flamegraph.pl or speedscope."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--route", help="Only this route name, e.g. product-list")
+        parser.add_argument(
+            "--output-dir",
+            help="Write <route>.folded files here instead of printing to stdout",
+        )
+        parser.add_argument(
+            "--clear", action="store_true", help="Drop the collected samples after"
+        )
+
+    def handle(self, *args, **options):
+        profiles = load_stacks(options["route"])
+        output_dir = options["output_dir"]
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        for route, stacks in profiles.items():
+            lines = [
+                f"{stack} {count}\n"
+                for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+            ]
+            if output_dir:
+                path = os.path.join(output_dir, f"{route.replace(':', '_')}.folded")
+                with open(path, "w", encoding="utf-8") as output:
+                    output.writelines(lines)
+                self.stdout.write(f"{route}: {sum(stacks.values())} samples -> {path}")
+            else:
+                # the route becomes the root frame, so one graph shows them all
+                self.stdout.write(
+                    "".join(f"{route};{line}" for line in lines), ending=""
+                )
+        if options["clear"]:
+            clear_stacks()
+        if not profiles:
+            self.stderr.write("No samples collected yet")
@@ -0,0 +1,80 @@
+import re
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from store.models import CartItem, Order, OrderItem, Product, ProductImage, Review
+
+SEQUENTIAL_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    # "SCAN t USING [COVERING] INDEX i" is an index walk, a bare "SCAN t" is not
+    "sqlite": re.compile(r"\bSCAN (\w+)(?! USING)\s*$", re.MULTILINE),
+}
+
+
+def endpoint_querysets():
+    products = Product.objects.order_by("-last_update", "-id")
+    return {
+        "product-list": products,
+        "product-list ?collection_id": products.filter(collection_id=1),
+        "product-list ?collection_id&unit_price__gt&unit_price__lt": products.filter(
+            collection_id=1, unit_price__gt=10, unit_price__lt=100
+        ),
+        "product-list ?ordering=unit_price": Product.objects.order_by(
+            "unit_price", "id"
+        ),
+        "product-list ?ordering=title": Product.objects.order_by("title", "id"),
+        "product-detail": Product.objects.filter(id=1),
+        "product-images": ProductImage.objects.filter(product_id__in=[1, 2, 3]),
+        "product-reviews-list": Review.objects.filter(product_id=1),
+        "orders-list": Order.objects.filter(customer_id=1),
+        "orders-list items": OrderItem.objects.filter(order_id__in=[1, 2, 3]),
+        "cart-items-list": CartItem.objects.select_related("product").filter(
+            cart_id=uuid4()
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN on the queryset behind each store endpoint and fails if "
+        "any of them falls back to a sequential scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans", action="store_true", help="Print every query plan."
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQUENTIAL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f"EXPLAIN checks are not supported on {connection.vendor}"
+            )
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # tiny dev tables make seq scans the cheapest plan; this shows
+                # whether an index *can* serve the query instead
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            for name, queryset in endpoint_querysets().items():
+                plan = queryset.explain()
+                if options["verbose_plans"]:
+                    self.stdout.write(f"{name}\n{plan}\n")
+                tables = pattern.findall(plan)
+                if tables:
+                    failures.append(name)
+                    self.stdout.write(
+                        self.style.ERROR(
+                            f"{name}: sequential scan on {', '.join(tables)}"
+                        )
+                    )
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} endpoint queries use sequential scans")
@@ -0,0 +1,23 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from store import catalog
+
+
+class Command(BaseCommand):
+    help = "Streams the product catalog as CSV or NDJSON to a file or stdout."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-")
+        parser.add_argument("--format", choices=catalog.FORMATS, default=catalog.CSV)
+        parser.add_argument("--chunk-size", type=int, default=catalog.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = catalog.export_products(options["format"], options["chunk_size"])
+        if options["path"] == "-":
+            sys.stdout.writelines(chunks)
+            return
+        with open(options["path"], "w", newline="", encoding="utf-8") as output:
+            output.writelines(chunks)
+        self.stdout.write(self.style.SUCCESS(f"Exported to {options['path']}"))
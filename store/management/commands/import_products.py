@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Upserts products by slug from a CSV or NDJSON file (or - for stdin) "
+        "in bulk batches, reporting rows that fail validation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=catalog.FORMATS,
+            help="Defaults to the file extension, or csv for stdin.",
+        )
+        parser.add_argument("--batch-size", type=int, default=catalog.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"]
+        if file_format is None:
+            suffix = Path(path).suffix.lstrip(".").lower()
+            file_format = suffix if suffix in catalog.FORMATS else catalog.CSV
+
+        if path == "-":
+            report = catalog.import_products(
+                sys.stdin, file_format, options["batch_size"]
+            )
+        else:
+            try:
+                with open(path, newline="", encoding="utf-8") as lines:
+                    report = catalog.import_products(
+                        lines, file_format, options["batch_size"]
+                    )
+            except OSError as exc:
+                raise CommandError(exc)
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(
+                f"... and {report.error_count - len(report.errors)} more errors"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Upserted {report.upserted} products, {report.error_count} errors"
+            )
+        )
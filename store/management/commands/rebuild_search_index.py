@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Product
+from store.search import get_search_backend, index_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-indexes every product for full-text search, e.g. after bulk loads "
+        "that bypass the post_save signal."
+    )
+
+    def handle(self, *args, **options):
+        if get_search_backend() is None:
+            self.stdout.write(self.style.WARNING("No search backend for this database"))
+            return
+        index_products()
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {Product.objects.count()} products")
+        )
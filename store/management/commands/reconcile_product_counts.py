@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from store.caching import CATALOG, expire_collections, expire_versions
+from store.models import Collection, ProductFacet
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes Collection.product_count from the product table, fixing "
+        "drift left by bulk writes that bypass the Product signals, and "
+        "rebuilds the product facet counts."
+    )
+
+    def handle(self, *args, **options):
+        drifted = Collection.objects.reconcile_product_counts()
+        if drifted:
+            expire_collections()
+        ProductFacet.objects.rebuild()
+        expire_versions(CATALOG)
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {drifted} collection product counts")
+        )
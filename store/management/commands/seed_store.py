@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-inserts a deterministic catalog with customers, carts and orders "
+        "for benchmarks and load tests. The same --seed always generates the "
+        "same rows."
+    )
+
+    def add_arguments(self, parser):
+        size = parser.add_mutually_exclusive_group()
+        size.add_argument("--scale", choices=seeding.SCALES, default="small")
+        size.add_argument("--products", type=int)
+        parser.add_argument("--seed", type=int, default=0)
+        for name in ["collections", "customers", "carts", "orders", "reviews"]:
+            parser.add_argument(
+                f"--{name}", type=int, help="Defaults to a ratio of --products"
+            )
+        parser.add_argument("--batch-size", type=int, default=seeding.BATCH_SIZE)
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Delete previously seeded rows first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            seeding.unseed()
+        elif seeding.is_seeded():
+            raise CommandError("The store is already seeded; pass --reset to redo it.")
+
+        counts = {
+            name: options[name]
+            for name in ["collections", "customers", "carts", "orders", "reviews"]
+            if options[name] is not None
+        }
+        start = time.perf_counter()
+        created = seeding.seed(
+            products=options["products"] or seeding.SCALES[options["scale"]],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            **counts,
+        )
+        elapsed = time.perf_counter() - start
+        summary = ", ".join(f"{count} {name}" for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s"))
@@ -0,0 +1,141 @@
+import hmac
+import os
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from rest_framework import serializers
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+REQUEST_LATENCY = Histogram(
+    "store_http_request_duration_seconds",
+    "Time spent answering a request, by route name.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "store_db_queries_per_request",
+    "Number of database queries run while answering a request.",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "store_db_query_duration_seconds_per_request",
+    "Total time spent in database queries while answering a request.",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "store_cache_requests_total",
+    "Cache reads by cache, tier and result; l1 is process memory, l2 redis.",
+    ["cache", "tier", "result"],
+)
+SERIALIZER_TIME = Histogram(
+    "store_serializer_duration_seconds",
+    "Time spent building response data, by serializer.",
+    ["serializer"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class RequestStats:
+    __slots__ = ["queries", "db_time"]
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# a context variable rather than a thread local so queries that async views
+# run through sync_to_async are still charged to their request
+current_request = ContextVar("current_request", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created fires on every reconnect of the same wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache(cache, tier, hit):
+    CACHE_REQUESTS.labels(cache, tier, "hit" if hit else "miss").inc()
+
+
+class MeasuredListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        start = perf_counter()
+        try:
+            return super().data
+        finally:
+            SERIALIZER_TIME.labels(type(self.child).__name__).observe(
+                perf_counter() - start
+            )
+
+
+class MeasuredSerializerMixin:
+    """
+    Records how long ``.data`` takes. Nested serializers are built through
+    ``to_representation``, so only the outermost one is counted.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if type(serializer) is serializers.ListSerializer:
+            # the stock list class has nothing of its own to lose
+            serializer.__class__ = MeasuredListSerializer
+        return serializer
+
+    @property
+    def data(self):
+        start = perf_counter()
+        try:
+            return super().data
+        finally:
+            SERIALIZER_TIME.labels(type(self).__name__).observe(perf_counter() - start)
+
+
+def metrics_view(request):
+    """
+    Prometheus exposition. With ``PROMETHEUS_MULTIPROC_DIR`` set, as it has
+    to be under gunicorn, it merges the samples of every worker.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and settings.IS_PRODUCTION:
+        # never open in production, even if the setting was overridden
+        return HttpResponseForbidden()
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
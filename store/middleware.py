@@ -0,0 +1,111 @@
+import hmac
+import random
+import threading
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from store.metrics import (
+    REQUEST_DB_TIME,
+    REQUEST_LATENCY,
+    REQUEST_QUERIES,
+    RequestStats,
+    current_request,
+)
+from store.profiling import sampler, save_stacks
+
+# unresolved paths share one label so scanners cannot blow up the series
+UNRESOLVED = "unresolved"
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class MetricsMiddleware:
+    """
+    Records latency, query count and query time per request, labelled with
+    the resolved route name, e.g. ``product-list``.
+
+    Cheap enough for production: nothing is written per request beyond the
+    in-memory Prometheus samples served on ``/metrics``. Put it first so it
+    times the rest of the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.observe(request, response, stats, perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.observe(request, response, stats, perf_counter() - start)
+        return response
+
+    def observe(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        route = match.view_name if match is not None else UNRESOLVED
+        method = request.method if request.method in METHODS else "other"
+        REQUEST_LATENCY.labels(method, route, response.status_code).observe(elapsed)
+        REQUEST_QUERIES.labels(route).observe(stats.queries)
+        REQUEST_DB_TIME.labels(route).observe(stats.db_time)
+
+
+class SamplingProfilerMiddleware:
+    """
+    Samples the stack of one in ``PROFILER_SAMPLE_RATE`` requests, of every
+    request to a route in ``PROFILER_ROUTES`` and of requests whose
+    ``X-Profile`` header carries ``PROFILER_TOKEN``, and adds them to the
+    per-route totals that ``manage.py dump_profiles`` writes out.
+
+    An unsampled request costs one random draw. It profiles the thread that
+    runs the view, so it only makes sense under WSGI; settings add it only
+    when one of the triggers is configured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profiled_route = None
+        try:
+            return self.get_response(request)
+        finally:
+            if request.profiled_route is not None:
+                save_stacks(request.profiled_route, sampler.stop(threading.get_ident()))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.should_profile(request):
+            request.profiled_route = request.resolver_match.view_name
+            sampler.start(threading.get_ident())
+
+    def should_profile(self, request):
+        rate = settings.PROFILER_SAMPLE_RATE
+        if rate and random.random() * rate < 1:
+            return True
+        if request.resolver_match.view_name in settings.PROFILER_ROUTES:
+            return True
+        token = settings.PROFILER_TOKEN
+        return bool(token) and hmac.compare_digest(
+            request.headers.get("X-Profile", ""), token
+        )
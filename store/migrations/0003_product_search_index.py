@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# frozen copies of the store.search backends as of this migration, so later
+# changes to the live index code cannot change what it creates
+CREATE_SQL = {
+    "postgresql": [
+        """
+        CREATE TABLE store_product_search (
+            product_id bigint PRIMARY KEY
+                REFERENCES store_product (id) ON DELETE CASCADE,
+            document tsvector NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX store_product_search_document_idx
+        ON store_product_search USING gin (document)
+        """,
+        """
+        INSERT INTO store_product_search (product_id, document)
+        SELECT id,
+               setweight(to_tsvector('english', title), 'A')
+               || setweight(to_tsvector('english', description), 'B')
+        FROM store_product
+        """,
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE store_product_fts USING fts5(
+            title, description, tokenize='porter unicode61', prefix='2 3'
+        )
+        """,
+        """
+        INSERT INTO store_product_fts (rowid, title, description)
+        SELECT id, title, description FROM store_product
+        """,
+    ],
+}
+
+DROP_SQL = {
+    "postgresql": ["DROP TABLE IF EXISTS store_product_search"],
+    "sqlite": ["DROP TABLE IF EXISTS store_product_fts"],
+}
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        with connection.cursor() as cursor:
+            for sql in statements.get(connection.vendor, []):
+                cursor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0002_product_order_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(run_vendor_sql(CREATE_SQL), run_vendor_sql(DROP_SQL)),
+    ]
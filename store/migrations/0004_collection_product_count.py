@@ -0,0 +1,38 @@
+# Generated by Django 5.0.4 on 2026-10-18 15:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_products(apps, schema_editor):
+    Collection = apps.get_model("store", "Collection")
+    Product = apps.get_model("store", "Product")
+    Collection.objects.update(
+        product_count=Coalesce(
+            Subquery(
+                Product.objects.filter(collection=OuterRef("pk"))
+                .order_by()
+                .values("collection")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0003_product_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="collection",
+            name="product_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.4 on 2026-10-18 16:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, Value, When
+
+# frozen copy of store.models.PRICE_BUCKET_EDGES as of this migration
+PRICE_BUCKET_EDGES = (0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def count_facets(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    ProductFacet = apps.get_model("store", "ProductFacet")
+    bucket = Case(
+        *[
+            When(unit_price__gte=edge, then=Value(bucket))
+            for bucket, edge in reversed(list(enumerate(PRICE_BUCKET_EDGES)))
+        ],
+        default=Value(0),
+        output_field=models.PositiveSmallIntegerField(),
+    )
+    cells = (
+        Product.objects.order_by()
+        .annotate(bucket=bucket)
+        .values("collection_id", "bucket")
+        .annotate(count=Count("pk"))
+    )
+    ProductFacet.objects.bulk_create(
+        [
+            ProductFacet(
+                collection_id=cell["collection_id"],
+                price_bucket=cell["bucket"],
+                product_count=cell["count"],
+            )
+            for cell in cells
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0005_collection_review_last_update"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductFacet",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("price_bucket", models.PositiveSmallIntegerField()),
+                ("product_count", models.IntegerField(default=0)),
+                (
+                    "collection",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="store.collection",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="productfacet",
+            constraint=models.UniqueConstraint(
+                fields=("collection", "price_bucket"), name="product_facet_cell"
+            ),
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
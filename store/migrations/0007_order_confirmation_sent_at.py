@@ -0,0 +1,34 @@
+# Generated by Django 5.0.4 on 2026-10-18 16:07
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_orders_confirmed(apps, schema_editor):
+    # orders placed before the queue existed must not all be mailed at once
+    Order = apps.get_model("store", "Order")
+    Order.objects.update(confirmation_sent_at=F("Order_placed_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0006_product_facet"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="confirmation_sent_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(mark_existing_orders_confirmed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("confirmation_sent_at__isnull", True)),
+                fields=["id"],
+                name="order_unconfirmed_idx",
+            ),
+        ),
+    ]
@@ -1,9 +1,12 @@
+from bisect import bisect_right
 from uuid import uuid4
 
 from django.conf import settings
 from django.contrib import admin
+from django.core.exceptions import ValidationError
 from django.core.validators import *
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.functions import Coalesce, Now
 
 from store.validators import validate_image_size
 
@@ -13,11 +16,41 @@ class Promotion(models.Model):
     discount = models.FloatField()
 
 
+class CollectionManager(models.Manager):
+    def adjust_product_count(self, collection_id, delta):
+        return self.filter(pk=collection_id).update(
+            product_count=models.F("product_count") + delta, last_update=Now()
+        )
+
+    def reconcile_product_counts(self):
+        """
+        Recomputes every ``product_count`` from the product table in one
+        UPDATE and returns how many collections had drifted.
+        """
+        actual = Coalesce(
+            models.Subquery(
+                Product.objects.filter(collection=models.OuterRef("pk"))
+                .order_by()
+                .values("collection")
+                .annotate(count=models.Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+        drifted = self.annotate(actual=actual).exclude(product_count=models.F("actual"))
+        return drifted.update(product_count=actual, last_update=Now())
+
+
 class Collection(models.Model):
     title = models.CharField(max_length=255)
     featured_product = models.ForeignKey(
         "Product", on_delete=models.SET_NULL, null=True, related_name="+"
     )
+    # maintained by the Product signal handlers, see reconcile_product_counts
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    last_update = models.DateTimeField(auto_now=True)
+
+    objects = CollectionManager()
 
     def __str__(self):
         return self.title
@@ -26,6 +59,39 @@ class Collection(models.Model):
         ordering = ["title"]
 
 
+class ProductManager(models.Manager):
+    def reserve_cart(self, cart_id):
+        """
+        Takes every line of a cart out of inventory with one conditional
+        UPDATE. Returns the ``(product_id, collection_id)`` pairs it reserved,
+        or ``None`` if some line did not have enough stock.
+
+        Must run inside a transaction: on ``None`` some rows may already be
+        decremented and the caller is expected to roll back. The update skips
+        the Product signals, so invalidating caches is left to the caller.
+        """
+        # lock in primary key order so checkouts sharing products queue up
+        # behind each other instead of deadlocking
+        products = list(
+            self.select_for_update(of=("self",))
+            .filter(cartitem__cart_id=cart_id)
+            .order_by("pk")
+            .values_list("pk", "collection_id")
+        )
+        quantity = CartItem.objects.filter(
+            cart_id=cart_id, product_id=models.OuterRef("pk")
+        ).values("quantity")
+        reserved = self.filter(
+            pk__in=[product_id for product_id, _ in products],
+            inventory__gte=models.Subquery(quantity),
+        ).update(
+            inventory=models.F("inventory") - models.Subquery(quantity),
+            # moves the ETag and Last-Modified of every reserved product
+            last_update=Now(),
+        )
+        return products if reserved == len(products) else None
+
+
 class Product(models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
@@ -37,9 +103,109 @@ class Product(models.Model):
     last_update = models.DateTimeField(auto_now=True)
     collection = models.ForeignKey(Collection, on_delete=models.PROTECT)
 
+    objects = ProductManager()
+
     def __str__(self):
         return self.title
 
+    class Meta:
+        # each index matches a ProductFilter / OrderingFilter access path,
+        # with id as the keyset pagination tie-breaker
+        indexes = [
+            models.Index(
+                fields=["collection", "unit_price"], name="product_collection_price_idx"
+            ),
+            models.Index(
+                fields=["collection", "-last_update", "-id"],
+                name="product_collection_recent_idx",
+            ),
+            models.Index(fields=["-last_update", "-id"], name="product_recent_idx"),
+            models.Index(fields=["unit_price", "id"], name="product_price_idx"),
+            models.Index(fields=["title", "id"], name="product_title_idx"),
+        ]
+
+
+# lower edges of the price facet buckets; the last one is open-ended
+PRICE_BUCKET_EDGES = (0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def price_bucket(unit_price):
+    return bisect_right(PRICE_BUCKET_EDGES, unit_price) - 1
+
+
+def price_bucket_expression():
+    return models.Case(
+        *[
+            models.When(unit_price__gte=edge, then=models.Value(bucket))
+            for bucket, edge in reversed(list(enumerate(PRICE_BUCKET_EDGES)))
+        ],
+        default=models.Value(0),
+        output_field=models.PositiveSmallIntegerField(),
+    )
+
+
+class ProductFacetManager(models.Manager):
+    def adjust(self, collection_id, bucket, delta):
+        cell = self.filter(collection_id=collection_id, price_bucket=bucket)
+        if cell.update(product_count=models.F("product_count") + delta) or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                self.create(
+                    collection_id=collection_id,
+                    price_bucket=bucket,
+                    product_count=delta,
+                )
+        except IntegrityError:
+            # another writer created the cell first
+            cell.update(product_count=models.F("product_count") + delta)
+
+    def rebuild(self):
+        """
+        Recomputes every cell from the product table, for writes that bypass
+        the Product signals.
+        """
+        cells = (
+            Product.objects.order_by()
+            .annotate(bucket=price_bucket_expression())
+            .values("collection_id", "bucket")
+            .annotate(count=models.Count("pk"))
+        )
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        collection_id=cell["collection_id"],
+                        price_bucket=cell["bucket"],
+                        product_count=cell["count"],
+                    )
+                    for cell in cells
+                ]
+            )
+
+
+class ProductFacet(models.Model):
+    """
+    Product count per collection and price bucket, maintained by the Product
+    signal handlers so facet counts never have to scan the product table.
+    """
+
+    collection = models.ForeignKey(
+        Collection, on_delete=models.CASCADE, related_name="+"
+    )
+    price_bucket = models.PositiveSmallIntegerField()
+    product_count = models.IntegerField(default=0)
+
+    objects = ProductFacetManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["collection", "price_bucket"], name="product_facet_cell"
+            )
+        ]
+
 
 class ProductImage(models.Model):
     product = models.ForeignKey(
@@ -82,6 +248,28 @@ class Customer(models.Model):
         ordering = ["user__first_name", "user__last_name"]
 
 
+class OrderManager(models.Manager):
+    def claim_unconfirmed(self):
+        """
+        Locks the oldest order whose confirmation has not been sent yet,
+        marks it as sent and returns it, or ``None`` when there is none.
+        Rows another worker holds are skipped.
+
+        Must run inside a transaction so a failed send rolls the claim back.
+        """
+        order = (
+            self.select_for_update(skip_locked=True, of=("self",))
+            .filter(confirmation_sent_at__isnull=True)
+            .select_related("customer__user")
+            .prefetch_related("items__product")
+            .order_by("pk")
+            .first()
+        )
+        if order is not None:
+            self.filter(pk=order.pk).update(confirmation_sent_at=Now())
+        return order
+
+
 class Order(models.Model):
     PAYMENT_STATUS_PENDING = "P"
     PAYMENT_STATUS_COMPLETE = "C"
@@ -100,11 +288,50 @@ class Order(models.Model):
         on_delete=models.PROTECT,
         related_name="orders",
     )
+    # null until the confirmation email has gone out
+    confirmation_sent_at = models.DateTimeField(null=True, editable=False)
+
+    objects = OrderManager()
 
     class Meta:
         permissions = [
             ("cancel_order", "can cancel order"),
         ]
+        indexes = [
+            models.Index(
+                fields=["customer", "-Order_placed_at"],
+                name="order_customer_placed_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(confirmation_sent_at__isnull=True),
+                name="order_unconfirmed_idx",
+            ),
+        ]
+
+
+class OrderItemManager(models.Manager):
+    def create_from_cart(self, order_id, cart_id):
+        """
+        Copies the lines of a cart into an order with a single
+        ``INSERT ... SELECT``, pricing them at the current unit price.
+        """
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        cart_value = CartItem._meta.get_field("cart").get_db_prep_value(
+            cart_id, connection
+        )
+        sql = f"""
+            INSERT INTO {qn(self.model._meta.db_table)}
+                (order_id, product_id, quantity, unit_price)
+            SELECT %s, ci.product_id, ci.quantity, p.unit_price
+            FROM {qn(CartItem._meta.db_table)} ci
+            JOIN {qn(Product._meta.db_table)} p ON p.id = ci.product_id
+            WHERE ci.cart_id = %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [order_id, cart_value])
+            return cursor.rowcount
 
 
 class OrderItem(models.Model):
@@ -113,6 +340,15 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
 
+    objects = OrderItemManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["order", "product"], name="orderitem_order_product_idx"
+            ),
+        ]
+
 
 class Address(models.Model):
     street = models.CharField(max_length=255)
@@ -127,11 +363,147 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 
+# upper bound of the PositiveSmallIntegerField on every supported database
+MAX_QUANTITY = 32767
+
+
+class CartItemManager(models.Manager):
+    def add(self, cart_id, product_id, quantity):
+        """
+        Adds ``quantity`` of a product to a cart, merging with an existing
+        line, and returns the cart item or ``None`` if the cart or product
+        does not exist. Raises ``ValidationError`` if the merged quantity
+        would exceed ``MAX_QUANTITY``.
+
+        On databases with ``ON CONFLICT`` this is a single
+        ``INSERT ... SELECT ... ON CONFLICT DO UPDATE``, so concurrent adds of
+        the same product cannot race the (cart, product) unique constraint.
+        """
+        connection = connections[self.db]
+        features = connection.features
+        if not (
+            features.supports_update_conflicts_with_target
+            and features.can_return_columns_from_insert
+        ):
+            return self._add_with_lookup(cart_id, product_id, quantity)
+
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        cart_value = self.model._meta.get_field("cart").get_db_prep_value(
+            cart_id, connection
+        )
+        # selecting from the parent tables makes the insert a no-op for a
+        # missing cart or product, instead of a deferred FK violation
+        sql = f"""
+            INSERT INTO {table} (cart_id, product_id, quantity)
+            SELECT c.id, p.id, %s
+            FROM {qn(Cart._meta.db_table)} c, {qn(Product._meta.db_table)} p
+            WHERE c.id = %s AND p.id = %s
+            ON CONFLICT (cart_id, product_id)
+            DO UPDATE SET quantity = {table}.quantity + excluded.quantity
+            WHERE {table}.quantity + excluded.quantity <= %s
+            RETURNING id, quantity
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [quantity, cart_value, product_id, MAX_QUANTITY])
+            row = cursor.fetchone()
+        if row is None:
+            # the guard skipped the update, or there was nothing to insert
+            if self.filter(cart_id=cart_id, product_id=product_id).exists():
+                raise self._too_large([product_id])
+            return None
+        return self.model(
+            id=row[0], cart_id=cart_id, product_id=product_id, quantity=row[1]
+        )
+
+    def apply_operations(self, cart_id, operations):
+        """
+        Applies a list of ``(op, product_id, quantity)`` cart operations, where
+        ``op`` is ``"add"``, ``"update"`` or ``"remove"``, with one bulk upsert
+        and one delete. Returns ``False`` if the cart does not exist.
+
+        Operations are folded in order first, so the same product may appear
+        several times. Products are expected to exist.
+        """
+        product_ids = {product_id for _, product_id, _ in operations}
+        with transaction.atomic(using=self.db):
+            # locking the cart serializes batches on it, so the quantities
+            # read below cannot change before the upsert
+            if not Cart.objects.select_for_update().filter(pk=cart_id).exists():
+                return False
+            existing = dict(
+                self.filter(cart_id=cart_id, product_id__in=product_ids).values_list(
+                    "product_id", "quantity"
+                )
+            )
+            quantities = dict(existing)
+            for op, product_id, quantity in operations:
+                if op == "add":
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+                elif op == "update":
+                    quantities[product_id] = quantity
+                else:
+                    quantities[product_id] = 0
+
+            removed = [
+                product_id
+                for product_id, quantity in quantities.items()
+                if not quantity and product_id in existing
+            ]
+            changed = [
+                self.model(cart_id=cart_id, product_id=product_id, quantity=quantity)
+                for product_id, quantity in quantities.items()
+                if quantity and quantity != existing.get(product_id)
+            ]
+            too_large = [
+                item.product_id for item in changed if item.quantity > MAX_QUANTITY
+            ]
+            if too_large:
+                raise self._too_large(too_large)
+
+            if removed:
+                self.filter(cart_id=cart_id, product_id__in=removed).delete()
+            if changed:
+                unique_fields = None
+                if connections[self.db].features.supports_update_conflicts_with_target:
+                    unique_fields = ["cart", "product"]
+                self.bulk_create(
+                    changed,
+                    update_conflicts=True,
+                    unique_fields=unique_fields,
+                    update_fields=["quantity"],
+                )
+        return True
+
+    def _too_large(self, product_ids):
+        return ValidationError(
+            {"quantity": [f"Exceeds {MAX_QUANTITY} for products {product_ids}"]}
+        )
+
+    def _add_with_lookup(self, cart_id, product_id, quantity):
+        with transaction.atomic(using=self.db):
+            if not Product.objects.filter(pk=product_id).exists():
+                return None
+            if not Cart.objects.filter(pk=cart_id).exists():
+                return None
+            cart_item, created = self.select_for_update().get_or_create(
+                cart_id=cart_id, product_id=product_id, defaults={"quantity": quantity}
+            )
+            if not created:
+                if cart_item.quantity + quantity > MAX_QUANTITY:
+                    raise self._too_large([product_id])
+                cart_item.quantity += quantity
+                cart_item.save(update_fields=["quantity"])
+            return cart_item
+
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
 
+    objects = CartItemManager()
+
     class Meta:
         unique_together = [["cart", "product"]]
 
@@ -143,3 +515,4 @@ class Review(models.Model):
     name = models.CharField(max_length=255)
     review_date = models.DateField(auto_now_add=True)
     description = models.TextField()
+    last_update = models.DateTimeField(auto_now=True)
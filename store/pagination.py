@@ -1,5 +1,212 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek-based pagination over whatever ordering the filters applied.
+
+    The primary key is appended as a tie-breaker and each page filters on the
+    last row of the previous one instead of using OFFSET, so every page costs
+    the same. The total count is skipped unless ``with_count`` is passed.
+    """
+
+    page_size = 10
+    cursor_query_param = "cursor"
+    count_query_param = "with_count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request)
+        if request.query_params.get(self.count_query_param):
+            self.count = queryset.order_by().count()
+        return self.read_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request)
+        if request.query_params.get(self.count_query_param):
+            self.count = await queryset.order_by().acount()
+        return self.read_page([row async for row in page])
+
+    def page_queryset(self, queryset, request):
+        # the page, one row longer to tell whether another follows; no query
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.count = None
+
+        self.values, self.reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.values is not None:
+            queryset = queryset.filter(self._seek(ordering, self.values))
+        return queryset[: self.page_size + 1]
+
+    def read_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.next_values = self.previous_values = None
+        if rows:
+            if has_more or self.reverse:
+                self.next_values = self._position(rows[-1])
+            if self.values is not None and (has_more or not self.reverse):
+                self.previous_values = self._position(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {
+            "next": self.encode_cursor(self.next_values, reverse=False),
+            "previous": self.encode_cursor(self.previous_values, reverse=True),
+            "results": data,
+        }
+        if self.count is not None:
+            payload = {"count": self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        pk_name = queryset.model._meta.pk.name
+        names = [field.lstrip("-") for field in ordering]
+        if pk_name not in names and "pk" not in names:
+            descending = bool(ordering) and ordering[-1].startswith("-")
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        self.model = queryset.model
+        return ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            values = [
+                self._to_python(field, value)
+                for field, value in zip(self.ordering, cursor["v"], strict=True)
+            ]
+            return values, bool(cursor.get("r"))
+        except (BinasciiError, KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, values, reverse):
+        if values is None:
+            return None
+        cursor = {"v": values}
+        if reverse:
+            cursor["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _position(self, row):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            if value is not None and not isinstance(value, (int, float, str)):
+                value = str(value)
+            position.append(value)
+        return position
+
+    def _to_python(self, field, value):
+        name = field.lstrip("-")
+        try:
+            return self.model._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            # annotations such as a search rank are kept as decoded
+            return value
+
+    def _invert(self, field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def _seek(self, ordering, values):
+        # (a, b, c) > (x, y, z) expanded into
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
 
 
 class ProductPagination(PageNumberPagination):
+    """
+    Page numbers by default; passing ``cursor`` (empty for the first page)
+    switches to keyset pagination for clients that scroll deep.
+    """
+
     page_size = 10
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` on the async ORM: the count and the page rows
+        are read with ``acount`` and async iteration.
+        """
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.page_size
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # counted here, so the paginator never runs its own count
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        # the page holds an unevaluated slice until now
+        self.page.object_list = [row async for row in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return self.page.object_list
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
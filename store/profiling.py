@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+from store.tiered_cache import get_redis_connection
+
+INTERVAL = 0.005
+MAX_DEPTH = 128
+
+ROUTES_KEY = "store:profile:routes"
+
+
+def stacks_key(route):
+    return f"store:profile:stacks:{route}"
+
+
+def collapse(frame):
+    """
+    Renders a frame and its callers as one line of the collapsed stack
+    format flamegraph.pl and speedscope read, outermost call first.
+    """
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}.{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    """
+    One background thread that snapshots the stacks of the threads currently
+    being profiled every ``interval`` seconds, and sleeps while there are
+    none. Threads that are not registered cost nothing.
+    """
+
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self.targets = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+
+    def start(self, thread_id):
+        stacks = Counter()
+        with self.lock:
+            self.targets[thread_id] = stacks
+            # a forked worker inherits the object but not the thread
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                threading.Thread(
+                    target=self.run, name="sampling-profiler", daemon=True
+                ).start()
+        self.wakeup.set()
+        return stacks
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.targets.pop(thread_id, Counter())
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.targets:
+                    self.wakeup.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self.targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+
+
+sampler = Sampler()
+
+
+def save_stacks(route, stacks):
+    """
+    Adds one request's samples to the totals for ``route``. With redis the
+    totals are shared by every worker and survive restarts until cleared.
+    """
+    if not stacks:
+        return
+    connection = get_redis_connection()
+    if connection is not None:
+        try:
+            pipeline = connection.pipeline()
+            pipeline.sadd(ROUTES_KEY, route)
+            for stack, count in stacks.items():
+                pipeline.hincrby(stacks_key(route), stack, count)
+            pipeline.execute()
+        except RedisError:
+            # losing a sample beats failing the request that was profiled
+            pass
+        return
+    routes = cache.get(ROUTES_KEY, set())
+    cache.set(ROUTES_KEY, routes | {route}, None)
+    totals = cache.get(stacks_key(route), Counter())
+    totals.update(stacks)
+    cache.set(stacks_key(route), totals, None)
+
+
+def load_stacks(route=None):
+    """
+    Returns ``{route: Counter(stack -> samples)}`` for one or every route.
+    """
+    connection = get_redis_connection()
+    if connection is not None:
+        routes = (
+            [route]
+            if route
+            else sorted(name.decode() for name in connection.smembers(ROUTES_KEY))
+        )
+        return {
+            name: Counter(
+                {
+                    stack.decode(): int(count)
+                    for stack, count in connection.hgetall(stacks_key(name)).items()
+                }
+            )
+            for name in routes
+        }
+    routes = [route] if route else sorted(cache.get(ROUTES_KEY, set()))
+    return {name: cache.get(stacks_key(name), Counter()) for name in routes}
+
+
+def clear_stacks():
+    connection = get_redis_connection()
+    if connection is not None:
+        routes = [name.decode() for name in connection.smembers(ROUTES_KEY)]
+        connection.delete(ROUTES_KEY, *[stacks_key(name) for name in routes])
+        return
+    routes = cache.get(ROUTES_KEY, set())
+    cache.delete_many([ROUTES_KEY, *[stacks_key(name) for name in routes]])
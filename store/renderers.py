@@ -0,0 +1,48 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+encoder = JSONEncoder()
+
+
+def default(obj):
+    # fall back to DRF's encoder so Decimals, datetimes and lazy strings come
+    # out exactly as they do from the stock JSONRenderer
+    return encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for ``JSONRenderer`` backed by orjson.
+
+    Indented output (``Accept: application/json; indent=4``) is left to the
+    stock renderer since orjson can only indent by two spaces.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=default, option=self.options)
+        # same escaping as JSONRenderer: these are valid JSON but end a
+        # JavaScript string literal
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=default, use_bin_type=True)
@@ -0,0 +1,167 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+TERM_PATTERN = re.compile(r"\w+")
+
+
+def search_terms(query):
+    return TERM_PATTERN.findall(query.lower())
+
+
+class PostgresSearchBackend:
+    """
+    Weighted ``tsvector`` documents in a side table with a GIN index.
+
+    Every term is matched as a prefix so partially typed words from the
+    search box already hit the index.
+    """
+
+    # created, with its GIN index, by migration 0003
+    table = "store_product_search"
+
+    def index(self, cursor, product_ids=None):
+        where, params = "", []
+        if product_ids is not None:
+            where, params = "WHERE id = ANY(%s)", [list(product_ids)]
+        cursor.execute(
+            f"""
+            INSERT INTO {self.table} (product_id, document)
+            SELECT id,
+                   setweight(to_tsvector('english', title), 'A')
+                   || setweight(to_tsvector('english', description), 'B')
+            FROM store_product {where}
+            ON CONFLICT (product_id) DO UPDATE SET document = excluded.document
+            """,
+            params,
+        )
+
+    def remove(self, cursor, product_ids):
+        cursor.execute(
+            f"DELETE FROM {self.table} WHERE product_id = ANY(%s)", [list(product_ids)]
+        )
+
+    def _query(self, terms, title_only):
+        weight = "A" if title_only else ""
+        return " & ".join(f"{term}:*{weight}" for term in terms)
+
+    def search(self, queryset, terms, title_only=False):
+        query = self._query(terms, title_only)
+        matches = RawSQL(
+            f"""
+            SELECT product_id FROM {self.table}
+            WHERE document @@ to_tsquery('english', %s)
+            """,
+            (query,),
+        )
+        rank = RawSQL(
+            f"""
+            SELECT ts_rank(document, to_tsquery('english', %s)) FROM {self.table}
+            WHERE product_id = store_product.id
+            """,
+            (query,),
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+class SQLiteSearchBackend:
+    """
+    FTS5 virtual table keyed by product rowid, ranked with bm25.
+
+    The prefix indexes keep two and three letter autocomplete lookups off the
+    full term list.
+    """
+
+    # created by migration 0003
+    table = "store_product_fts"
+
+    def index(self, cursor, product_ids=None):
+        where, params = "", []
+        if product_ids is not None:
+            product_ids = list(product_ids)
+            placeholders = ", ".join(["%s"] * len(product_ids))
+            where, params = f"WHERE id IN ({placeholders})", product_ids
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", params
+            )
+        else:
+            cursor.execute(f"DELETE FROM {self.table}")
+        cursor.execute(
+            f"""
+            INSERT INTO {self.table} (rowid, title, description)
+            SELECT id, title, description FROM store_product {where}
+            """,
+            params,
+        )
+
+    def remove(self, cursor, product_ids):
+        product_ids = list(product_ids)
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        cursor.execute(
+            f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", product_ids
+        )
+
+    def _query(self, terms, title_only):
+        query = " ".join(f'"{term}"*' for term in terms)
+        return f"title : ({query})" if title_only else query
+
+    def search(self, queryset, terms, title_only=False):
+        query = self._query(terms, title_only)
+        matches = RawSQL(
+            f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", (query,)
+        )
+        # bm25 is lower-is-better; negate it so both backends rank descending
+        rank = RawSQL(
+            f"""
+            SELECT -bm25({self.table}, 10.0, 1.0) FROM {self.table}
+            WHERE {self.table} MATCH %s AND rowid = store_product.id
+            """,
+            (query,),
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_search_backend(using=connection):
+    backend_class = BACKENDS.get(using.vendor)
+    return backend_class() if backend_class else None
+
+
+def index_products(product_ids=None):
+    backend = get_search_backend()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.index(cursor, product_ids)
+
+
+def remove_products(product_ids):
+    backend = get_search_backend()
+    product_ids = list(product_ids)
+    if backend is not None and product_ids:
+        with connection.cursor() as cursor:
+            backend.remove(cursor, product_ids)
+
+
+def search_products(queryset, query, title_only=False):
+    """
+    Returns ``queryset`` narrowed to the products matching ``query`` and
+    annotated with ``search_rank`` (higher is better), or ``None`` when the
+    database has no full-text backend.
+    """
+    backend = get_search_backend()
+    if backend is None:
+        return None
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    return backend.search(queryset, terms, title_only)
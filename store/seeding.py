@@ -0,0 +1,317 @@
+import random
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from store.caching import CATALOG, collection_scope, expire_collections, expire_versions
+from store.models import (
+    Address,
+    Cart,
+    CartItem,
+    Collection,
+    Customer,
+    Order,
+    OrderItem,
+    Product,
+    ProductFacet,
+    ProductImage,
+    Review,
+)
+from store.search import get_search_backend, index_products
+
+SCALES = {"small": 1_000, "medium": 100_000, "large": 1_000_000}
+BATCH_SIZE = 5000
+
+PREFIX = "seed"
+# every seeded user can log in with it, e.g. from the locust scenarios
+PASSWORD = "seed-password"
+# seeded cart ids start with these 48 bits, so unseed can tell them apart
+# from real carts without a column of their own
+CART_ID_MARKER = 0x5EED5EED5EED
+SEEDED_CART_IDS = (
+    uuid.UUID(int=CART_ID_MARKER << 80),
+    uuid.UUID(int=((CART_ID_MARKER + 1) << 80) - 1),
+)
+
+ADJECTIVES = [
+    "Classic", "Compact", "Deluxe", "Eco", "Essential", "Fresh", "Golden",
+    "Handmade", "Light", "Modern", "Organic", "Premium", "Rustic", "Smart",
+    "Sturdy", "Vintage",
+]  # fmt: skip
+NOUNS = [
+    "Backpack", "Blender", "Candle", "Chair", "Coffee", "Headphones", "Jacket",
+    "Kettle", "Lamp", "Mug", "Notebook", "Pillow", "Sneakers", "Teapot",
+    "Towel", "Watch",
+]  # fmt: skip
+FIRST_NAMES = [
+    "Ada", "Ali", "Chen", "Eva", "Ines", "Jon", "Kofi", "Lena", "Maya", "Omar",
+]  # fmt: skip
+LAST_NAMES = [
+    "Berg", "Diaz", "Haq", "Ito", "Khan", "Lopez", "Novak", "Okafor", "Rossi",
+]  # fmt: skip
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def bulk_insert(model, rows, batch_size):
+    count = 0
+    for batch in batched(rows, batch_size):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        count += len(batch)
+    return count
+
+
+def default_counts(products):
+    return {
+        "collections": max(10, products // 1000),
+        "customers": max(10, products // 10),
+        "carts": max(10, products // 20),
+        "orders": max(10, products // 10),
+        "reviews": products // 2,
+    }
+
+
+def seed(products=SCALES["small"], seed=0, batch_size=BATCH_SIZE, **counts):
+    """
+    Bulk-inserts a deterministic store: the same arguments always generate
+    the same rows. ``counts`` overrides the sizes ``default_counts`` derives
+    from ``products``. Returns the number of rows per model.
+    """
+    counts = {**default_counts(products), **counts, "products": products}
+    rng = random.Random(seed)
+    created = {}
+
+    with transaction.atomic():
+        created["collections"] = bulk_insert(
+            Collection,
+            (
+                Collection(
+                    title=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}s ({PREFIX} {n})"
+                )
+                for n in range(counts["collections"])
+            ),
+            batch_size,
+        )
+    collection_ids = list(
+        Collection.objects.filter(title__contains=f"({PREFIX} ")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+    prices = []
+
+    def product_rows():
+        for n in range(products):
+            price = Decimal(rng.randrange(100, 100_000)) / 100
+            prices.append(price)
+            title = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {n}"
+            yield Product(
+                title=title,
+                slug=f"{PREFIX}-product-{n}",
+                description=f"{title}, generated for load tests.",
+                unit_price=price,
+                inventory=rng.randrange(0, 500),
+                collection_id=rng.choice(collection_ids),
+            )
+
+    with transaction.atomic():
+        created["products"] = bulk_insert(Product, product_rows(), batch_size)
+    product_ids = list(
+        Product.objects.filter(slug__startswith=f"{PREFIX}-product-")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+    with transaction.atomic():
+        created["reviews"] = bulk_insert(
+            Review,
+            (
+                Review(
+                    product_id=rng.choice(product_ids),
+                    name=rng.choice(FIRST_NAMES),
+                    description="Does what it says.",
+                )
+                for _ in range(counts["reviews"])
+            ),
+            batch_size,
+        )
+
+    password = make_password(PASSWORD)
+    User = get_user_model()
+    with transaction.atomic():
+        created["customers"] = bulk_insert(
+            User,
+            (
+                User(
+                    username=f"{PREFIX}-customer-{n}",
+                    email=f"{PREFIX}-customer-{n}@example.com",
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    password=password,
+                )
+                for n in range(counts["customers"])
+            ),
+            batch_size,
+        )
+        user_ids = list(
+            User.objects.filter(username__startswith=f"{PREFIX}-customer-")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        # bulk_create skips the signal that creates the customer
+        bulk_insert(
+            Customer,
+            (
+                Customer(
+                    user_id=user_id,
+                    phone_number=f"+1555{rng.randrange(10**7):07d}",
+                    birth_date=date(1960, 1, 1) + timedelta(days=rng.randrange(15000)),
+                    membership=rng.choice(Customer.MEMBERSHIP_CHOICES)[0],
+                )
+                for user_id in user_ids
+            ),
+            batch_size,
+        )
+    customer_ids = list(
+        Customer.objects.filter(user__username__startswith=f"{PREFIX}-customer-")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+    cart_ids = [
+        uuid.UUID(int=CART_ID_MARKER << 80 | rng.getrandbits(80), version=4)
+        for _ in range(counts["carts"])
+    ]
+    with transaction.atomic():
+        created["carts"] = bulk_insert(
+            Cart, (Cart(id=cart_id) for cart_id in cart_ids), batch_size
+        )
+        bulk_insert(
+            CartItem,
+            (
+                CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)
+                for cart_id in cart_ids
+                for product_id, quantity in picks(rng, product_ids, 5)
+            ),
+            batch_size,
+        )
+
+    price_of = dict(zip(product_ids, prices))
+    # already confirmed, so the order confirmation task leaves them alone
+    confirmed_at = timezone.now()
+    with transaction.atomic():
+        created["orders"] = bulk_insert(
+            Order,
+            (
+                Order(
+                    customer_id=rng.choice(customer_ids),
+                    payment_status=rng.choice(Order.PAYMENT_STATUS_CHOICES)[0],
+                    confirmation_sent_at=confirmed_at,
+                )
+                for _ in range(counts["orders"])
+            ),
+            batch_size,
+        )
+        order_ids = list(
+            Order.objects.filter(
+                customer__user__username__startswith=f"{PREFIX}-customer-"
+            )
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        bulk_insert(
+            OrderItem,
+            (
+                OrderItem(
+                    order_id=order_id,
+                    product_id=product_id,
+                    quantity=quantity,
+                    unit_price=price_of[product_id],
+                )
+                for order_id in order_ids
+                for product_id, quantity in picks(rng, product_ids, 4)
+            ),
+            batch_size,
+        )
+
+    refresh_derived_data()
+    return created
+
+
+def picks(rng, product_ids, most):
+    count = min(rng.randint(1, most), len(product_ids))
+    return [
+        (product_id, rng.randint(1, 3)) for product_id in rng.sample(product_ids, count)
+    ]
+
+
+def is_seeded():
+    return Product.objects.filter(slug__startswith=f"{PREFIX}-product-").exists()
+
+
+def refresh_derived_data():
+    # bulk writes skip the signals that keep these up to date
+    Collection.objects.reconcile_product_counts()
+    ProductFacet.objects.rebuild()
+    if get_search_backend() is not None:
+        index_products()
+    expire_collections()
+    expire_versions(
+        CATALOG,
+        *[
+            collection_scope(collection_id)
+            for collection_id in Collection.objects.values_list("id", flat=True)
+        ],
+    )
+
+
+def raw_delete(queryset):
+    # one DELETE without loading rows, firing signals or following cascades,
+    # so callers remove the referencing rows first
+    return queryset._raw_delete(queryset.db)
+
+
+def unseed():
+    """
+    Deletes everything ``seed`` generated, keeping other rows.
+
+    Rows go in bulk behind the Product and Collection signals, whose
+    per-row handlers would make this unusable at the larger scales; the
+    derived data they maintain is refreshed once at the end.
+    """
+    users = f"{PREFIX}-customer-"
+    products = Product.objects.filter(slug__startswith=f"{PREFIX}-product-")
+    collections = Collection.objects.filter(title__contains=f"({PREFIX} ")
+    with transaction.atomic():
+        raw_delete(
+            OrderItem.objects.filter(order__customer__user__username__startswith=users)
+        )
+        raw_delete(Order.objects.filter(customer__user__username__startswith=users))
+        # real carts only lose their seeded products
+        raw_delete(CartItem.objects.filter(product__in=products))
+        first, last = SEEDED_CART_IDS
+        raw_delete(CartItem.objects.filter(cart_id__gte=first, cart_id__lte=last))
+        raw_delete(Cart.objects.filter(pk__range=SEEDED_CART_IDS))
+        raw_delete(Address.objects.filter(customer__user__username__startswith=users))
+        raw_delete(Customer.objects.filter(user__username__startswith=users))
+        get_user_model().objects.filter(username__startswith=users).delete()
+
+        raw_delete(Review.objects.filter(product__in=products))
+        raw_delete(ProductImage.objects.filter(product__in=products))
+        Collection.objects.filter(featured_product__in=products).update(
+            featured_product=None
+        )
+        raw_delete(products)
+        raw_delete(ProductFacet.objects.filter(collection__in=collections))
+        raw_delete(collections)
+    refresh_derived_data()
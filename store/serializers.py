@@ -1,9 +1,22 @@
 from decimal import Decimal
+from functools import partial
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
+from django.db.models import Count, F
 from rest_framework import serializers
-
+from rest_framework.exceptions import NotFound
+
+from .caching import (
+    CATALOG,
+    bump_version,
+    collection_scope,
+    get_collections,
+    product_scope,
+)
+from .metrics import MeasuredListSerializer, MeasuredSerializerMixin
 from .models import (
+    MAX_QUANTITY,
     Cart,
     CartItem,
     Collection,
@@ -16,6 +29,10 @@ from .models import (
 )
 from .signals import order_created
 
+# built once from a string: Decimal(1.18) would carry the binary float error
+# and cost a float -> Decimal conversion on every product
+TAX_RATE = Decimal("1.18")
+
 
 class SimpleProductSerializer(serializers.ModelSerializer):
     class Meta:
@@ -29,60 +46,109 @@ class UpdateCartItemSerializer(serializers.ModelSerializer):
         fields = ["quantity"]
 
 
-class AddCartItemSerializer(serializers.ModelSerializer):
+class AddCartItemSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     product_id = serializers.IntegerField()
 
-    def validate_product_id(self, value):
-        if not Product.objects.filter(pk=value).exists():
-            raise serializers.ValidationError("Product doesn't exists with that id")
-        return value
-
     def save(self, **kwargs):
         cart_id = self.context["cart_id"]
         product_id = self.validated_data["product_id"]
         quantity = self.validated_data["quantity"]
+        # the upsert doubles as the product / cart existence check
         try:
-            cart_item = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-            cart_item.quantity += quantity
-            cart_item.save()
-            self.instance = cart_item
-        except CartItem.DoesNotExist:
-            self.instance = CartItem.objects.create(
-                cart_id=cart_id, **self.validated_data
+            self.instance = CartItem.objects.add(cart_id, product_id, quantity)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.message_dict)
+        if self.instance is None:
+            if not Cart.objects.filter(pk=cart_id).exists():
+                raise NotFound("Cart doesn't exists with that id")
+            raise serializers.ValidationError(
+                {"product_id": ["Product doesn't exists with that id"]}
             )
         return self.instance
 
     class Meta:
         model = CartItem
         fields = ["id", "product_id", "quantity"]
+        extra_kwargs = {"quantity": {"max_value": MAX_QUANTITY}}
 
 
-class CartItemSerializer(serializers.ModelSerializer):
-    product = SimpleProductSerializer()
-    total_price = serializers.SerializerMethodField()
+class CartItemOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=["add", "update", "remove"])
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(
+        min_value=1, max_value=MAX_QUANTITY, required=False
+    )
+
+    def validate(self, attrs):
+        if attrs["op"] != "remove" and "quantity" not in attrs:
+            raise serializers.ValidationError({"quantity": ["This field is required."]})
+        return attrs
+
+
+class BatchCartItemSerializer(serializers.Serializer):
+    operations = CartItemOperationSerializer(
+        many=True, allow_empty=False, max_length=100
+    )
+
+    def validate_operations(self, operations):
+        product_ids = {operation["product_id"] for operation in operations}
+        found = set(
+            Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True)
+        )
+        missing = sorted(product_ids - found)
+        if missing:
+            raise serializers.ValidationError(
+                f"Products don't exist with ids {', '.join(map(str, missing))}"
+            )
+        return operations
+
+    def save(self, **kwargs):
+        operations = [
+            (operation["op"], operation["product_id"], operation.get("quantity"))
+            for operation in self.validated_data["operations"]
+        ]
+        try:
+            applied = CartItem.objects.apply_operations(
+                self.context["cart_id"], operations
+            )
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.message_dict)
+        if not applied:
+            raise NotFound("Cart doesn't exists with that id")
 
-    def get_total_price(self, cart_item: CartItem):
-        return cart_item.quantity * cart_item.product.unit_price
+
+class CartItemSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
+    product = SimpleProductSerializer()
+    # annotated by the viewset queryset
+    total_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = CartItem
         fields = ["id", "product", "quantity", "total_price"]
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     id = serializers.UUIDField(read_only=True)
     items = CartItemSerializer(many=True, read_only=True)
-    total_price = serializers.SerializerMethodField()
+    # annotated by the viewset queryset
+    total_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
 
-    def get_total_price(self, cart: Cart):
-        return sum([item.quantity * item.product.price for item in cart.items.all()])
+    def create(self, validated_data):
+        cart = super().create(validated_data)
+        # a new cart has no items, so there is nothing to annotate
+        cart.total_price = Decimal(0)
+        return cart
 
     class Meta:
         model = Cart
         fields = ["id", "items", "total_price"]
 
 
-class CollectionSerializer(serializers.ModelSerializer):
+class CollectionSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Collection
         fields = ["id", "title", "product_count", "featured_product"]
@@ -91,7 +157,7 @@ class CollectionSerializer(serializers.ModelSerializer):
     featured_product = serializers.PrimaryKeyRelatedField(read_only=True)
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     def create(self, validated_data):
         product_id = self.context["product_id"]
         return ProductImage.objects.create(product_id=product_id, **validated_data)
@@ -101,9 +167,25 @@ class ProductImageSerializer(serializers.ModelSerializer):
         fields = ["id", "image"]
 
 
+class CachedCollectionField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks the collection up in the tiered reference cache rather than
+    querying for it on every product write.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not str(data).isdigit():
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        collection = get_collections().get(int(data))
+        if collection is None:
+            self.fail("does_not_exist", pk_value=data)
+        return collection
+
+
 # it is better to use ModelSerializer class for Models
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
+    collection = CachedCollectionField(queryset=Collection.objects.all())
 
     class Meta:
         model = Product
@@ -122,10 +204,86 @@ class ProductSerializer(serializers.ModelSerializer):
     price_with_tax = serializers.SerializerMethodField(method_name="calculate_tax")
 
     def calculate_tax(self, product: Product):
-        return product.unit_price * Decimal(1.18)
-
+        return product.unit_price * TAX_RATE
+
+
+class FastProductListSerializer(MeasuredListSerializer):
+    def to_representation(self, data):
+        rows = list(data)
+        images = self.child.get_images([row["id"] for row in rows])
+        represent = self.child.represent
+        return [represent(row, images.get(row["id"], [])) for row in rows]
+
+
+class FastProductSerializer(MeasuredSerializerMixin, serializers.BaseSerializer):
+    """
+    Read-only ``ProductSerializer`` for list and retrieve that works on
+    ``.values(*FastProductSerializer.values_fields)`` rows.
+
+    It skips model instantiation and per-field dispatch, loads all images of
+    a page in one query and renders exactly the same JSON.
+    """
+
+    values_fields = (
+        "id",
+        "title",
+        "description",
+        "slug",
+        "inventory",
+        "unit_price",
+        "collection_id",
+        "last_update",
+    )
+    unit_price_field = serializers.DecimalField(max_digits=6, decimal_places=2)
+    image_storage = ProductImage._meta.get_field("image").storage
 
-class ReviewSerializer(serializers.ModelSerializer):
+    class Meta:
+        list_serializer_class = FastProductListSerializer
+
+    def get_images_queryset(self, product_ids):
+        return (
+            ProductImage.objects.filter(product_id__in=product_ids)
+            .order_by("id")
+            .values_list("product_id", "id", "image")
+        )
+
+    def group_images(self, image_rows):
+        request = self.context.get("request")
+        url = storage_url = self.image_storage.url
+        if request is not None:
+
+            def url(name):
+                return request.build_absolute_uri(storage_url(name))
+
+        images = {}
+        for product_id, image_id, name in image_rows:
+            images.setdefault(product_id, []).append(
+                {"id": image_id, "image": url(name) if name else None}
+            )
+        return images
+
+    def get_images(self, product_ids):
+        return self.group_images(self.get_images_queryset(product_ids))
+
+    def represent(self, row, images):
+        unit_price = row["unit_price"]
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "slug": row["slug"],
+            "inventory": row["inventory"],
+            "unit_price": self.unit_price_field.to_representation(unit_price),
+            "price_with_tax": unit_price * TAX_RATE,
+            "collection": row["collection_id"],
+            "images": images,
+        }
+
+    def to_representation(self, row):
+        return self.represent(row, self.get_images([row["id"]]).get(row["id"], []))
+
+
+class ReviewSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ["id", "name", "description", "review_date"]
@@ -135,7 +293,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         return Review.objects.create(product_id=product_id, **validated_data)
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     user_id = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -151,7 +309,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ["id", "product", "unit_price", "quantity"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
 
     class Meta:
@@ -165,38 +323,82 @@ class UpdateOrderSerializer(serializers.ModelSerializer):
         fields = ["payment_status"]
 
 
+class OutOfStock(Exception):
+    def __init__(self, shortages):
+        super().__init__("Some items are no longer in stock")
+        self.shortages = shortages
+
+
 class CreateOrderSerializer(serializers.Serializer):
     cart_id = serializers.UUIDField()
 
     def validate_cart_id(self, cart_id):
-        if not Cart.objects.filter(pk=cart_id).exists():
+        item_count = (
+            Cart.objects.filter(pk=cart_id)
+            .annotate(item_count=Count("items"))
+            .values_list("item_count", flat=True)
+            .first()
+        )
+        if item_count is None:
             raise serializers.ValidationError("Cart with this id, doesn't exist")
-        if CartItem.objects.filter(cart_id=cart_id).count() == 0:
+        if item_count == 0:
             raise serializers.ValidationError("Cart is empty")
         return cart_id
 
+    def get_shortages(self, cart_id):
+        return [
+            {
+                "product_id": item["product_id"],
+                "requested": item["quantity"],
+                "available": item["available"],
+            }
+            for item in CartItem.objects.filter(
+                cart_id=cart_id, quantity__gt=F("product__inventory")
+            ).values("product_id", "quantity", available=F("product__inventory"))
+        ]
+
     def save(self, **kwargs):
-        with transaction.atomic():
-            customer = Customer.objects.get(user_id=self.context["user_id"])
-            order = Order.objects.create(customer=customer)
-            cart_id = self.validated_data["cart_id"]
-            cart_items = CartItem.objects.select_related("product").filter(
-                cart_id=cart_id
-            )
-            # List comprehension
-            # [expression for item in collection]
-            order_items = [
-                OrderItem(
-                    order=order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    unit_price=item.product.unit_price,
+        cart_id = self.validated_data["cart_id"]
+        try:
+            with transaction.atomic():
+                # locking the cart and its lines keeps items from being added
+                # or changed between the reservation and copying them into
+                # the order; new lines wait on the cart row through their FK
+                if not Cart.objects.select_for_update().filter(pk=cart_id).exists():
+                    raise serializers.ValidationError(
+                        {"cart_id": ["Cart with this id, doesn't exist"]}
+                    )
+                list(
+                    CartItem.objects.select_for_update()
+                    .filter(cart_id=cart_id)
+                    .values_list("pk", flat=True)
+                )
+                # inventory is reserved first so an oversold cart rolls back
+                # before anything else is written
+                products = Product.objects.reserve_cart(cart_id)
+                if products is None:
+                    raise OutOfStock([])
+                if not products:
+                    raise serializers.ValidationError({"cart_id": ["Cart is empty"]})
+                bump_version(
+                    CATALOG,
+                    *{product_scope(product_id) for product_id, _ in products},
+                    *{collection_scope(collection_id) for _, collection_id in products},
+                )
+                customer_id = Customer.objects.values_list("id", flat=True).get(
+                    user_id=self.context["user_id"]
+                )
+                order = Order.objects.create(customer_id=customer_id)
+                OrderItem.objects.create_from_cart(order.id, cart_id)
+                # after the cart items is added to order, cart should be deleted
+                Cart.objects.filter(pk=cart_id).delete()
+                # receivers run once the order is committed, outside the
+                # checkout transaction
+                transaction.on_commit(
+                    partial(order_created.send_robust, self.__class__, order=order)
                 )
-                for item in cart_items
-            ]
-            # create order_items in bulk
-            OrderItem.objects.bulk_create(order_items)
-            # after the cart items is added to order, cart should be deleted
-            Cart.objects.filter(pk=cart_id).delete()
-            order_created.send_robust(self.__class__, order=order)
-            return order
+                return order
+        except OutOfStock as error:
+            # read after the rollback so the numbers reflect committed stock
+            error.shortages = self.get_shortages(cart_id)
+            raise
@@ -1,8 +1,28 @@
+from decimal import Decimal
+
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 
-from store.models import Customer
+from store.caching import (
+    CATALOG,
+    bump_version,
+    collection_scope,
+    expire_collections,
+    product_scope,
+)
+from store.models import (
+    Collection,
+    Customer,
+    Product,
+    ProductFacet,
+    ProductImage,
+    price_bucket,
+)
+from store.search import index_products, remove_products
+from store.signals import order_created
+from store.tasks import queue_order_confirmations
 
 
 # store/signals.py
@@ -10,3 +30,122 @@ from store.models import Customer
 def create_customer_for_new_user(sender, **kwargs):
     if kwargs["created"]:
         Customer.objects.create(user=kwargs["instance"])
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_collection(sender, instance, **kwargs):
+    # needed so a product moving between collections invalidates both of them,
+    # and moves its facet cell when the price changes bucket
+    instance._previous_collection_id = None
+    instance._previous_unit_price = None
+    if instance.pk:
+        previous = (
+            Product.objects.filter(pk=instance.pk)
+            .values_list("collection_id", "unit_price")
+            .first()
+        )
+        if previous is not None:
+            (
+                instance._previous_collection_id,
+                instance._previous_unit_price,
+            ) = previous
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    scopes = {
+        CATALOG,
+        product_scope(instance.pk),
+        collection_scope(instance.collection_id),
+    }
+    previous_collection_id = getattr(instance, "_previous_collection_id", None)
+    if previous_collection_id is not None:
+        scopes.add(collection_scope(previous_collection_id))
+    bump_version(*scopes)
+
+
+@receiver(post_save, sender=Product)
+def count_saved_product(sender, instance, created, **kwargs):
+    previous_collection_id = getattr(instance, "_previous_collection_id", None)
+    if created:
+        Collection.objects.adjust_product_count(instance.collection_id, 1)
+        expire_collections()
+    elif previous_collection_id not in (None, instance.collection_id):
+        Collection.objects.adjust_product_count(previous_collection_id, -1)
+        Collection.objects.adjust_product_count(instance.collection_id, 1)
+        expire_collections()
+
+
+@receiver(post_delete, sender=Product)
+def count_deleted_product(sender, instance, **kwargs):
+    Collection.objects.adjust_product_count(instance.collection_id, -1)
+    expire_collections()
+
+
+@receiver(post_save, sender=Product)
+def count_saved_product_facet(sender, instance, created, **kwargs):
+    cell = (instance.collection_id, price_bucket(Decimal(instance.unit_price)))
+    if created:
+        ProductFacet.objects.adjust(*cell, 1)
+        return
+    previous_unit_price = getattr(instance, "_previous_unit_price", None)
+    if previous_unit_price is None:
+        return
+    previous_cell = (
+        instance._previous_collection_id,
+        price_bucket(previous_unit_price),
+    )
+    if previous_cell != cell:
+        ProductFacet.objects.adjust(*previous_cell, -1)
+        ProductFacet.objects.adjust(*cell, 1)
+
+
+@receiver(post_delete, sender=Product)
+def count_deleted_product_facet(sender, instance, **kwargs):
+    ProductFacet.objects.adjust(
+        instance.collection_id, price_bucket(Decimal(instance.unit_price)), -1
+    )
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    remove_products([instance.pk])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_product_for_image(sender, instance, **kwargs):
+    # images are part of the product representation, so its ETag has to move
+    Product.objects.filter(pk=instance.product_id).update(last_update=timezone.now())
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_image_cache(sender, instance, **kwargs):
+    scopes = {CATALOG, product_scope(instance.product_id)}
+    collection_id = (
+        Product.objects.filter(pk=instance.product_id)
+        .values_list("collection_id", flat=True)
+        .first()
+    )
+    if collection_id is not None:
+        scopes.add(collection_scope(collection_id))
+    bump_version(*scopes)
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+def invalidate_collection_cache(sender, instance, **kwargs):
+    bump_version(CATALOG, collection_scope(instance.pk))
+    expire_collections()
+
+
+@receiver(order_created)
+def confirm_order(sender, order, **kwargs):
+    queue_order_confirmations()
@@ -0,0 +1,215 @@
+import asyncio
+import threading
+import time
+from functools import wraps
+from weakref import WeakValueDictionary
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponseBase
+from redis.exceptions import LockError, RedisError
+from rest_framework import status
+from rest_framework.response import Response
+
+from store.metrics import record_cache
+
+LOCK_TIMEOUT = 10
+WAIT_TIMEOUT = 2.0
+POLL_INTERVAL = 0.025
+STALE_TIMEOUT = 24 * 60 * 60
+
+# a lock lives as long as the thread holding it, so the map never outgrows
+# the keys currently being computed
+_local_locks = WeakValueDictionary()
+_local_locks_guard = threading.Lock()
+
+
+class LocalLock:
+    def __init__(self, lock):
+        # keeps the lock referenced, and therefore registered, while held
+        self.lock = lock
+
+    def release(self):
+        self.lock.release()
+
+
+def _acquire_local(lock_key):
+    with _local_locks_guard:
+        lock = _local_locks.get(lock_key)
+        if lock is None:
+            lock = _local_locks[lock_key] = threading.Lock()
+    return LocalLock(lock) if lock.acquire(blocking=False) else None
+
+
+def acquire(lock_key, timeout=LOCK_TIMEOUT):
+    """
+    Tries to take the lock for ``lock_key`` without blocking and returns it,
+    or ``None`` if another worker holds it.
+
+    Uses a Redis lock when the cache is ``django_redis`` so one worker across
+    all processes wins, and a per-process lock for other backends or while
+    Redis is unreachable.
+    """
+    lock_factory = getattr(cache, "lock", None)
+    if lock_factory is not None:
+        try:
+            lock = lock_factory(lock_key, timeout=timeout)
+            return lock if lock.acquire(blocking=False) else None
+        except RedisError:
+            pass
+    return _acquire_local(lock_key)
+
+
+def release(lock):
+    try:
+        lock.release()
+    except (LockError, RedisError):
+        # expired while computing; the next miss simply takes it again
+        pass
+
+
+class StaleCopy:
+    """A value served from the stale key while another worker recomputes it."""
+
+    __slots__ = ["value"]
+
+    def __init__(self, value):
+        self.value = value
+
+
+def get_or_compute(
+    key,
+    compute,
+    timeout,
+    stale_key=None,
+    wait_timeout=WAIT_TIMEOUT,
+    stale_timeout=STALE_TIMEOUT,
+    name="response",
+    mark_stale=False,
+):
+    """
+    Returns the cached value for ``key``, running ``compute()`` on a miss
+    in only one worker at a time.
+
+    The others return the copy under ``stale_key`` if there is one, wrapped
+    in ``StaleCopy`` when ``mark_stale`` is set, or poll for the fresh value
+    for up to ``wait_timeout`` seconds before computing it themselves.
+    ``compute()`` returning ``None`` means "do not cache". ``name`` labels
+    the hit/miss metrics.
+    """
+    value = cache.get(key)
+    record_cache(name, "l2", value is not None)
+    if value is not None:
+        return value
+
+    lock = acquire(f"{key}:lock")
+    if lock is None:
+        if stale_key is not None:
+            value = cache.get(stale_key)
+            if value is not None:
+                return StaleCopy(value) if mark_stale else value
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        # the winner is slow or died; better a duplicate than a hung request
+        return compute()
+
+    try:
+        # it may have been filled between the first read and the lock
+        value = cache.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None:
+            cache.set(key, value, timeout)
+            if stale_key is not None:
+                cache.set(stale_key, value, stale_timeout)
+        return value
+    finally:
+        release(lock)
+
+
+async def aget_or_compute(
+    key, compute, timeout, wait_timeout=WAIT_TIMEOUT, name="response"
+):
+    """
+    ``get_or_compute`` for coroutines: ``compute`` is an async function and
+    waiting for another worker's value does not block the event loop.
+    """
+    value = await cache.aget(key)
+    record_cache(name, "l2", value is not None)
+    if value is not None:
+        return value
+
+    lock = await sync_to_async(acquire)(f"{key}:lock")
+    if lock is None:
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            value = await cache.aget(key)
+            if value is not None:
+                return value
+        return await compute()
+
+    try:
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+        value = await compute()
+        if value is not None:
+            await cache.aset(key, value, timeout)
+        return value
+    finally:
+        await sync_to_async(release)(lock)
+
+
+class CachedResponse:
+    __slots__ = ["data"]
+
+    def __init__(self, data):
+        self.data = data
+
+
+def single_flight(key, timeout, stale_key=None):
+    """
+    Decorator form of ``get_or_compute``. ``key`` and ``stale_key`` are
+    called with the decorated function's arguments.
+
+    Works on plain functions and on viewset actions: for a DRF response only
+    the data of a 200 is cached, and it comes back as a new ``Response``.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            computed = None
+
+            def compute():
+                nonlocal computed
+                computed = func(*args, **kwargs)
+                if not isinstance(computed, HttpResponseBase):
+                    return computed
+                if computed.status_code == status.HTTP_200_OK and hasattr(
+                    computed, "data"
+                ):
+                    return CachedResponse(computed.data)
+                return None
+
+            value = get_or_compute(
+                key(*args, **kwargs),
+                compute,
+                timeout,
+                stale_key(*args, **kwargs) if stale_key is not None else None,
+            )
+            if isinstance(computed, HttpResponseBase):
+                return computed
+            if isinstance(value, CachedResponse):
+                return Response(value.data)
+            return value
+
+        return wrapper
+
+    return decorator
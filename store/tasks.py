@@ -0,0 +1,78 @@
+import logging
+from smtplib import SMTPException
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from kombu.exceptions import OperationalError
+
+from store.models import Order
+
+logger = logging.getLogger(__name__)
+
+SCHEDULED_KEY = "store:order-confirmations:scheduled"
+
+
+def queue_order_confirmations():
+    """
+    Schedules a confirmation run unless one is already due, so orders placed
+    within ``ORDER_CONFIRMATION_DELAY`` seconds of each other go out together.
+    """
+    delay = settings.ORDER_CONFIRMATION_DELAY
+    if not cache.add(SCHEDULED_KEY, True, timeout=delay):
+        return
+    try:
+        send_order_confirmations.apply_async(countdown=delay)
+    except OperationalError:
+        # the order is committed either way; the periodic run picks it up
+        cache.delete(SCHEDULED_KEY)
+        logger.warning("could not queue order confirmations")
+
+
+def confirmation_message(order):
+    items = list(order.items.all())
+    context = {
+        "order": order,
+        "items": items,
+        "total": sum(item.quantity * item.unit_price for item in items),
+    }
+    return EmailMessage(
+        subject=f"Your order #{order.pk} is confirmed",
+        body=render_to_string("store/emails/order_confirmation.txt", context),
+        from_email=settings.DEFAULT_EMAIL_FROM,
+        to=[order.customer.user.email],
+    )
+
+
+@shared_task(
+    autoretry_for=(SMTPException, OSError),
+    retry_backoff=True,
+    max_retries=5,
+    ignore_result=True,
+)
+def send_order_confirmations(batch_size=None):
+    """
+    Emails every order that has not been confirmed yet, reusing one SMTP
+    connection for up to ``batch_size`` messages.
+
+    Each order is claimed, mailed and committed in its own transaction, so a
+    failure only rolls back the order being sent and a retry picks up from
+    there. Only a commit failing right after a successful send can mail an
+    order twice.
+    """
+    cache.delete(SCHEDULED_KEY)
+    batch_size = batch_size or settings.ORDER_CONFIRMATION_BATCH_SIZE
+    sent = 0
+    while True:
+        with get_connection() as connection:
+            for _ in range(batch_size):
+                with transaction.atomic():
+                    order = Order.objects.claim_unconfirmed()
+                    if order is None:
+                        return sent
+                    if order.customer.user.email:
+                        connection.send_messages([confirmation_message(order)])
+                        sent += 1
@@ -0,0 +1,207 @@
+"""
+Latency and query count of every GET route in ``store.urls`` against a
+catalog generated by ``store.seeding``. Deselected by default, run it with
+
+    pytest -m benchmark store/tests/benchmarks
+
+and with ``DATABASE_URL=postgres://...`` to measure PostgreSQL instead of
+SQLite. Each run writes ``results/<vendor>.json`` and fails on routes that
+need more queries than ``baselines/<vendor>.json`` or whose cold p50 grew
+past ``BENCHMARK_TOLERANCE`` times the baseline plus ``BENCHMARK_SLACK_MS``,
+which keeps millisecond routes from failing on noise. Set
+``BENCHMARK_UPDATE_BASELINES=1`` to record the current run as the baseline;
+latencies are only comparable on the machine that recorded them. A route
+missing from the baseline, or a database without one, fails until a
+baseline is recorded for it.
+"""
+
+import json
+import os
+import statistics
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from store import seeding
+from store.caching import reference_cache
+from store.models import Cart, Order, Product, ProductImage, Review
+
+pytestmark = pytest.mark.benchmark
+
+PRODUCTS = int(os.environ.get("BENCHMARK_PRODUCTS", 1000))
+SAMPLES = int(os.environ.get("BENCHMARK_SAMPLES", 30))
+TOLERANCE = float(os.environ.get("BENCHMARK_TOLERANCE", 1.5))
+SLACK_MS = float(os.environ.get("BENCHMARK_SLACK_MS", 5))
+UPDATE_BASELINES = os.environ.get("BENCHMARK_UPDATE_BASELINES") == "1"
+
+HERE = Path(__file__).parent
+
+ROUTES = [
+    "product-list",
+    "product-detail",
+    "product-autocomplete",
+    "product-facets",
+    "product-export",
+    "product-reviews-list",
+    "product-reviews-detail",
+    "product-images-list",
+    "product-images-detail",
+    "collection-list",
+    "collection-detail",
+    "cart-detail",
+    "cart-items-list",
+    "cart-items-detail",
+    "customer-list",
+    "customer-detail",
+    "customer-me",
+    "orders-list",
+    "orders-detail",
+    "async-product-list",
+    "async-product-detail",
+    "async-product-reviews-list",
+    "async-collection-list",
+    "async-collection-detail",
+    "async-cart-detail",
+]
+# routes without a GET
+SKIPPED = {"product-import", "cart-list", "cart-items-batch"}
+
+QUERY_STRINGS = {"product-autocomplete": "?q=cl"}
+
+
+def percentile(samples, percent):
+    return statistics.quantiles(samples, n=100, method="inclusive")[percent - 1]
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+def measure(client, url):
+    cold, warm, queries = [], [], []
+    for _ in range(SAMPLES):
+        cache.clear()
+        reference_cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            cold.append(perf_counter() - start)
+        assert response.status_code == status.HTTP_200_OK, url
+        queries.append(len(captured))
+
+        start = perf_counter()
+        response = client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        warm.append(perf_counter() - start)
+    return {
+        "queries": max(queries),
+        "cold_p50_ms": milliseconds(percentile(cold, 50)),
+        "cold_p99_ms": milliseconds(percentile(cold, 99)),
+        "warm_p50_ms": milliseconds(percentile(warm, 50)),
+        "warm_p99_ms": milliseconds(percentile(warm, 99)),
+    }
+
+
+@pytest.fixture(scope="module")
+def dataset(django_db_setup, django_db_blocker):
+    # module scoped, so it runs before the conftest swaps in locmem
+    locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    with django_db_blocker.unblock(), override_settings(CACHES=locmem):
+        seeding.seed(products=PRODUCTS)
+        order = Order.objects.filter(
+            customer__user__username__startswith=seeding.PREFIX
+        ).first()
+        user = order.customer.user
+        user.is_staff = True
+        user.save(update_fields=["is_staff"])
+        review = Review.objects.filter(product__slug__startswith=seeding.PREFIX).first()
+        product = review.product
+        image = ProductImage.objects.create(product=product, image="store/images/a.jpg")
+        cart = Cart.objects.filter(items__isnull=False).first()
+        yield {
+            "user": user,
+            "kwargs": {
+                "product-detail": {"id": product.id},
+                "product-reviews-list": {"product_id": product.id},
+                "product-reviews-detail": {"product_id": product.id, "id": review.id},
+                "product-images-list": {"product_id": product.id},
+                "product-images-detail": {"product_id": product.id, "pk": image.id},
+                "collection-detail": {"pk": product.collection_id},
+                "cart-detail": {"id": cart.id},
+                "cart-items-list": {"cart_id": cart.id},
+                "cart-items-detail": {
+                    "cart_id": cart.id,
+                    "id": cart.items.first().id,
+                },
+                "customer-detail": {"pk": user.customer.id},
+                "orders-detail": {"pk": order.id},
+                "async-product-detail": {"id": product.id},
+                "async-product-reviews-list": {"product_id": product.id},
+                "async-collection-detail": {"pk": product.collection_id},
+                "async-cart-detail": {"id": cart.id},
+            },
+        }
+        image.delete()
+        seeding.unseed()
+
+
+@pytest.fixture(scope="module")
+def report():
+    vendor = connection.vendor
+    baseline_path = HERE / "baselines" / f"{vendor}.json"
+    baseline = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())["routes"]
+    results = {}
+    yield baseline, results
+
+    document = {
+        "vendor": vendor,
+        "products": PRODUCTS,
+        "samples": SAMPLES,
+        "routes": dict(sorted(results.items())),
+    }
+    output = HERE / "results" / f"{vendor}.json"
+    output.parent.mkdir(exist_ok=True)
+    output.write_text(json.dumps(document, indent=2) + "\n")
+    if UPDATE_BASELINES:
+        baseline_path.write_text(json.dumps(document, indent=2) + "\n")
+
+
+def test_every_get_route_is_benchmarked(store_route_names):
+    assert store_route_names <= set(ROUTES) | SKIPPED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("route", ROUTES)
+def test_route(route, dataset, report, api_client):
+    baseline, results = report
+    api_client.force_authenticate(user=dataset["user"])
+    url = reverse(route, kwargs=dataset["kwargs"].get(route, {}))
+    url += QUERY_STRINGS.get(route, "")
+
+    results[route] = result = measure(api_client, url)
+
+    if UPDATE_BASELINES:
+        return
+    expected = baseline.get(route)
+    if expected is None:
+        # a gate without a baseline would pass anything
+        pytest.fail(
+            f"no {connection.vendor} baseline for {route}; record one with "
+            "BENCHMARK_UPDATE_BASELINES=1"
+        )
+    assert result["queries"] <= expected["queries"], result
+    assert (
+        result["cold_p50_ms"] <= expected["cold_p50_ms"] * TOLERANCE + SLACK_MS
+    ), result
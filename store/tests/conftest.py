@@ -1,8 +1,41 @@
 import pytest
+from django.core.cache import cache
+from django.urls import get_resolver
 from rest_framework.test import APIClient
 
+from store.caching import reference_cache
+
 
 @pytest.fixture
 def api_client():
     return APIClient()
-  
\ No newline at end of file
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    # tests must not depend on a running redis
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    yield
+    cache.clear()
+    reference_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def without_silk(settings):
+    # silk writes every request to the database, which skews query counts
+    settings.MIDDLEWARE = [
+        middleware for middleware in settings.MIDDLEWARE if "silk" not in middleware
+    ]
+
+
+@pytest.fixture(scope="session")
+def store_route_names():
+    # every named route in store.urls, for the suites that must cover them all
+    names = set()
+    for pattern in get_resolver("store.urls").url_patterns:
+        for route in getattr(pattern, "url_patterns", [pattern]):
+            if route.name and route.name != "api-root":
+                names.add(route.name)
+    return names
@@ -0,0 +1,76 @@
+import pytest
+from model_bakery import baker
+from rest_framework import status
+
+from store.models import Cart, CartItem, Collection, Product, ProductImage, Review
+
+
+@pytest.fixture
+def catalog():
+    collection = baker.make(Collection)
+    products = baker.make(
+        Product, collection=collection, unit_price="12.50", _quantity=15
+    )
+    baker.make(ProductImage, product=products[0], image="store/images/a.jpg")
+    baker.make(Review, product=products[0], _quantity=2)
+    cart = baker.make(Cart)
+    baker.make(CartItem, cart=cart, product=products[1], quantity=2)
+    return {"collection": collection, "product": products[0], "cart": cart}
+
+
+@pytest.mark.django_db
+class TestAsyncReadPaths:
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "products/",
+            "products/?page=2&ordering=unit_price,-title",
+            "products/?collection_id={collection.id}&unit_price__lt=20",
+            "products/?cursor=&ordering=-unit_price",
+            "products/?cursor=&with_count=1",
+            "products/?page=last",
+            "products/{product.id}/",
+            "products/{product.id}/reviews/",
+            "collections/",
+            "collections/{collection.id}/",
+            "carts/{cart.id}/",
+        ],
+    )
+    def test_matches_the_sync_api(self, api_client, catalog, path):
+        path = path.format(**catalog)
+
+        sync = api_client.get(f"/api/store/{path}")
+        response = api_client.get(f"/api/store/async/{path}")
+
+        assert response.status_code == status.HTTP_200_OK
+        expected = sync.content.replace(b"/api/store/", b"/api/store/async/")
+        assert response.content == expected
+
+    def test_missing_product_returns_404(self, api_client):
+        response = api_client.get("/api/store/async/products/0/")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize(
+        "query", ["cursor=not-a-cursor", "page=99", "unit_price__gt=x"]
+    )
+    def test_rejects_what_the_sync_api_rejects(self, api_client, catalog, query):
+        sync = api_client.get(f"/api/store/products/?{query}")
+        response = api_client.get(f"/api/store/async/products/?{query}")
+
+        assert response.status_code == sync.status_code
+        assert response.json() == sync.json()
+
+    def test_follows_keyset_cursors_like_the_sync_api(self, api_client, catalog):
+        sync = api_client.get("/api/store/products/?cursor=").json()
+        response = api_client.get("/api/store/async/products/?cursor=").json()
+        next_page = response["next"].split("/api/store/async/products/")[1]
+
+        sync_next = api_client.get(f"/api/store/products/{next_page}")
+        async_next = api_client.get(f"/api/store/async/products/{next_page}")
+
+        assert response["next"] == sync["next"].replace(
+            "/api/store/", "/api/store/async/"
+        )
+        assert async_next.status_code == status.HTTP_200_OK
+        assert async_next.json()["results"] == sync_next.json()["results"]
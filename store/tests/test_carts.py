@@ -0,0 +1,118 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework import status
+
+from store.models import MAX_QUANTITY, Cart, CartItem, Product
+
+
+@pytest.mark.django_db
+class TestAddCartItem:
+    def test_adding_twice_merges_quantities_in_one_query(self, api_client):
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+        url = f"/api/store/carts/{cart.id}/items/"
+        api_client.post(url, {"product_id": product.id, "quantity": 2})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(url, {"product_id": product.id, "quantity": 3})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["quantity"] == 5
+        assert CartItem.objects.get(cart=cart, product=product).quantity == 5
+        assert len(queries) == 1
+
+    def test_if_merged_quantity_is_too_large_returns_400(self, api_client):
+        item = baker.make(CartItem, quantity=MAX_QUANTITY - 1)
+
+        response = api_client.post(
+            f"/api/store/carts/{item.cart_id}/items/",
+            {"product_id": item.product_id, "quantity": 2},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["quantity"] is not None
+        item.refresh_from_db()
+        assert item.quantity == MAX_QUANTITY - 1
+
+    def test_if_product_does_not_exist_returns_400(self, api_client):
+        cart = baker.make(Cart)
+
+        response = api_client.post(
+            f"/api/store/carts/{cart.id}/items/", {"product_id": 0, "quantity": 1}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["product_id"] is not None
+
+
+@pytest.mark.django_db
+class TestRetrieveCart:
+    def test_totals_are_exact(self, api_client):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product__unit_price="0.10", quantity=3)
+        baker.make(CartItem, cart=cart, product__unit_price="19.99", quantity=2)
+
+        response = api_client.get(f"/api/store/carts/{cart.id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["total_price"] == Decimal("40.28")
+        assert sorted(item["total_price"] for item in response.data["items"]) == [
+            Decimal("0.30"),
+            Decimal("39.98"),
+        ]
+
+    def test_new_cart_has_zero_total(self, api_client):
+        response = api_client.post("/api/store/carts/")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["total_price"] == 0
+
+
+@pytest.mark.django_db
+class TestBatchCartItems:
+    def test_applies_every_operation_in_one_request(self, api_client):
+        cart = baker.make(Cart)
+        kept, removed, added = baker.make(Product, _quantity=3)
+        baker.make(CartItem, cart=cart, product=kept, quantity=1)
+        baker.make(CartItem, cart=cart, product=removed, quantity=1)
+        operations = [
+            {"op": "add", "product_id": kept.id, "quantity": 2},
+            {"op": "remove", "product_id": removed.id},
+            {"op": "add", "product_id": added.id, "quantity": 1},
+            {"op": "add", "product_id": added.id, "quantity": 4},
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(
+                f"/api/store/carts/{cart.id}/items/batch/",
+                {"operations": operations},
+                format="json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        quantities = {item["product"]["id"]: item["quantity"] for item in response.data}
+        assert quantities == {kept.id: 3, added.id: 5}
+        assert len(queries) <= 8
+
+    def test_if_a_product_does_not_exist_nothing_is_applied(self, api_client):
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+
+        response = api_client.post(
+            f"/api/store/carts/{cart.id}/items/batch/",
+            {
+                "operations": [
+                    {"op": "add", "product_id": product.id, "quantity": 1},
+                    {"op": "add", "product_id": 0, "quantity": 1},
+                ]
+            },
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "operations" in response.data
+        assert not CartItem.objects.filter(cart=cart).exists()
@@ -0,0 +1,114 @@
+import pytest
+from django.contrib.auth import get_user_model
+from model_bakery import baker
+from rest_framework import status
+
+from store.catalog import import_products
+from store.models import Collection, Product
+
+
+@pytest.fixture
+def staff_client(api_client):
+    api_client.force_authenticate(user=baker.make(get_user_model(), is_staff=True))
+    return api_client
+
+
+CSV = """title,slug,description,unit_price,inventory,collection
+Steel Kettle,,Boils water,19.99,5,Kitchen
+Teapot,teapot,Ceramic,not-a-price,5,Kitchen
+Mug,mug,Holds tea,4.50,20,Kitchen
+"""
+
+
+@pytest.mark.django_db
+class TestImportProducts:
+    def test_upserts_valid_rows_and_reports_invalid_ones(self, staff_client):
+        response = staff_client.post(
+            "/api/store/products/import/", CSV, content_type="text/csv"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["upserted"] == 2
+        assert response.data["error_count"] == 1
+        [error] = response.data["errors"]
+        assert error["line"] == 3
+        assert "unit_price" in error["errors"]
+        kitchen = Collection.objects.get(title="Kitchen")
+        assert kitchen.product_count == 2
+        assert Product.objects.get(slug="steel-kettle").collection == kitchen
+
+    def test_reimporting_updates_by_slug(self, staff_client):
+        product = baker.make(Product, slug="mug", inventory=1)
+        ndjson = (
+            '{"slug": "mug", "title": "Mug", "description": "Tea", '
+            f'"unit_price": 5, "inventory": 8, "collection": {product.collection_id}}}\n'
+        )
+
+        response = staff_client.post(
+            "/api/store/products/import/", ndjson, content_type="application/x-ndjson"
+        )
+
+        assert response.data["upserted"] == 1
+        product.refresh_from_db()
+        assert product.inventory == 8
+        assert Product.objects.count() == 1
+
+    def test_rows_generating_the_same_slug_are_reported(self, staff_client):
+        csv = (
+            "title,slug,description,unit_price,inventory,collection\n"
+            "Mug,,Blue,4.50,20,Kitchen\n"
+            "Mug,,Red,5.50,10,Kitchen\n"
+        )
+
+        response = staff_client.post(
+            "/api/store/products/import/", csv, content_type="text/csv"
+        )
+
+        assert response.data["upserted"] == 1
+        [error] = response.data["errors"]
+        assert error["line"] == 3
+        assert "slug" in error["errors"]
+        assert Product.objects.get(slug="mug").description == "Blue"
+
+    def test_generated_slug_collisions_are_found_across_batches(self):
+        lines = [
+            "title,slug,description,unit_price,inventory,collection\n",
+            "Mug,,Blue,4.50,20,Kitchen\n",
+            "Cup,cup,White,3.00,10,Kitchen\n",
+            "Mug,,Red,5.50,10,Kitchen\n",
+        ]
+
+        report = import_products(lines, batch_size=1)
+
+        assert report.upserted == 2
+        [error] = report.errors
+        assert error["line"] == 4
+        assert Product.objects.get(slug="mug").description == "Blue"
+
+    def test_if_user_is_not_staff_returns_403(self, api_client):
+        api_client.force_authenticate(user=baker.make(get_user_model()))
+
+        response = api_client.post(
+            "/api/store/products/import/", CSV, content_type="text/csv"
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestExportProducts:
+    def test_export_streams_a_csv_that_imports_back(self, staff_client):
+        products = baker.make(Product, unit_price="9.99", description="x", _quantity=3)
+
+        response = staff_client.get("/api/store/products/export/")
+        exported = b"".join(response.streaming_content).decode()
+        Product.objects.update(inventory=0)
+        staff_client.post(
+            "/api/store/products/import/", exported, content_type="text/csv"
+        )
+
+        assert response["Content-Type"] == "text/csv"
+        assert len(exported.splitlines()) == 4
+        assert sorted(Product.objects.values_list("inventory", flat=True)) == sorted(
+            product.inventory for product in products
+        )
@@ -45,3 +45,49 @@ class TestRetriveCollection:
             "title": collection.title,
             "product_count": 0,
         }
+
+
+@pytest.mark.django_db
+class TestCollectionProductCount:
+    def test_count_follows_product_changes(self, api_client):
+        source, target = baker.make(Collection, _quantity=2)
+        products = baker.make(Product, collection=source, _quantity=3)
+        products[0].collection = target
+        products[0].save()
+        products[1].delete()
+
+        response = api_client.get("/api/store/collections/")
+
+        counts = {item["id"]: item["product_count"] for item in response.data}
+        assert counts == {source.id: 1, target.id: 1}
+
+    def test_reconcile_fixes_drift(self):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=2)
+        Collection.objects.update(product_count=7)
+
+        drifted = Collection.objects.reconcile_product_counts()
+
+        collection.refresh_from_db()
+        assert drifted == 1
+        assert collection.product_count == 2
+
+
+@pytest.mark.django_db
+class TestCollectionConditionalGet:
+    def test_adding_a_product_changes_the_etag(
+        self, api_client, django_capture_on_commit_callbacks
+    ):
+        collection = baker.make(Collection)
+        url = f"/api/store/collections/{collection.id}/"
+        etag = api_client.get(url)["ETag"]
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == (
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(Product, collection=collection)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["product_count"] == 1
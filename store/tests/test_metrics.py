@@ -0,0 +1,86 @@
+import pytest
+from model_bakery import baker
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+from store.models import Collection
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+class TestMetrics:
+    def test_records_latency_queries_and_serializer_time_per_route(self, api_client):
+        baker.make(Collection)
+        requests = sample(
+            "store_http_request_duration_seconds_count",
+            method="GET",
+            route="collection-list",
+            status="200",
+        )
+        queries = sample("store_db_queries_per_request_sum", route="collection-list")
+        serialized = sample(
+            "store_serializer_duration_seconds_count", serializer="CollectionSerializer"
+        )
+
+        api_client.get("/api/store/collections/")
+
+        assert (
+            sample(
+                "store_http_request_duration_seconds_count",
+                method="GET",
+                route="collection-list",
+                status="200",
+            )
+            == requests + 1
+        )
+        assert sample("store_db_queries_per_request_sum", route="collection-list") > (
+            queries
+        )
+        assert (
+            sample(
+                "store_serializer_duration_seconds_count",
+                serializer="CollectionSerializer",
+            )
+            == serialized + 1
+        )
+
+    def test_counts_cache_hits_and_misses(self, api_client):
+        hits = sample(
+            "store_cache_requests_total", cache="reference", tier="l1", result="hit"
+        )
+
+        api_client.get("/api/store/collections/")
+        api_client.get("/api/store/collections/")
+
+        assert (
+            sample(
+                "store_cache_requests_total", cache="reference", tier="l1", result="hit"
+            )
+            > hits
+        )
+
+    def test_endpoint_exposes_the_samples(self, api_client):
+        response = api_client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"store_http_request_duration_seconds" in response.content
+
+    def test_endpoint_requires_the_token_when_set(self, api_client, settings):
+        settings.METRICS_TOKEN = "secret"
+
+        assert api_client.get("/metrics").status_code == status.HTTP_403_FORBIDDEN
+        assert (
+            api_client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code
+            == status.HTTP_200_OK
+        )
+
+    def test_endpoint_is_closed_in_production_without_a_token(
+        self, api_client, settings
+    ):
+        settings.METRICS_TOKEN = ""
+        settings.IS_PRODUCTION = True
+
+        assert api_client.get("/metrics").status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,132 @@
+from smtplib import SMTPException
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.mail.backends import locmem
+from model_bakery import baker
+from rest_framework import status
+
+from store import tasks
+from store.models import Cart, CartItem, Order, OrderItem, Product
+
+
+@pytest.fixture
+def customer_client(api_client):
+    user = baker.make(get_user_model())
+    api_client.force_authenticate(user=user)
+    return api_client
+
+
+@pytest.mark.django_db
+class TestCreateOrder:
+    def test_order_takes_cart_out_of_inventory(self, customer_client):
+        product = baker.make(Product, inventory=5, unit_price=3)
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=product, quantity=2)
+
+        response = customer_client.post("/api/store/orders/", {"cart_id": cart.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        product.refresh_from_db()
+        assert product.inventory == 3
+        [item] = response.data["items"]
+        assert item["quantity"] == 2
+        assert item["unit_price"] == 3
+        assert not Cart.objects.filter(pk=cart.id).exists()
+
+    def test_order_refreshes_cached_product(
+        self, customer_client, django_capture_on_commit_callbacks
+    ):
+        product = baker.make(Product, inventory=5)
+        url = f"/api/store/products/{product.id}/"
+        etag = customer_client.get(url)["ETag"]
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=product, quantity=2)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            customer_client.post("/api/store/orders/", {"cart_id": cart.id})
+        response = customer_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["inventory"] == 3
+
+    def test_if_stock_is_short_returns_400_and_changes_nothing(self, customer_client):
+        in_stock = baker.make(Product, inventory=5)
+        short = baker.make(Product, inventory=1)
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=in_stock, quantity=2)
+        baker.make(CartItem, cart=cart, product=short, quantity=3)
+
+        response = customer_client.post("/api/store/orders/", {"cart_id": cart.id})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["items"] == [
+            {"product_id": short.id, "requested": 3, "available": 1}
+        ]
+        in_stock.refresh_from_db()
+        assert in_stock.inventory == 5
+        assert not Order.objects.exists()
+
+    def test_if_cart_is_empty_returns_400(self, customer_client):
+        cart = baker.make(Cart)
+
+        response = customer_client.post("/api/store/orders/", {"cart_id": cart.id})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestOrderConfirmations:
+    def test_checkout_queues_one_run_after_commit(
+        self, customer_client, django_capture_on_commit_callbacks, monkeypatch
+    ):
+        queued = []
+        monkeypatch.setattr(
+            tasks.send_order_confirmations,
+            "apply_async",
+            lambda **options: queued.append(options),
+        )
+        for _ in range(2):
+            cart = baker.make(Cart)
+            baker.make(CartItem, cart=cart, product__inventory=5, quantity=1)
+            queued_before = list(queued)
+            with django_capture_on_commit_callbacks() as callbacks:
+                customer_client.post("/api/store/orders/", {"cart_id": cart.id})
+                # nothing is queued while the checkout is uncommitted
+                assert queued == queued_before
+            for callback in callbacks:
+                callback()
+
+        assert queued == [{"countdown": 10}]
+
+    def test_sends_each_confirmation_once(self, mailoutbox):
+        user = baker.make(get_user_model(), email="ada@example.com")
+        orders = baker.make(Order, customer=user.customer, _quantity=3)
+        baker.make(OrderItem, order=orders[0], quantity=2, unit_price=3)
+
+        assert tasks.send_order_confirmations(batch_size=2) == 3
+        assert tasks.send_order_confirmations() == 0
+        assert len(mailoutbox) == 3
+        assert "Total: 6" in mailoutbox[0].body
+        assert not Order.objects.filter(confirmation_sent_at__isnull=True).exists()
+
+    def test_failed_send_keeps_earlier_confirmations(self, mailoutbox, monkeypatch):
+        for n in range(3):
+            user = baker.make(get_user_model(), email=f"customer-{n}@example.com")
+            baker.make(Order, customer=user.customer)
+        send_messages = locmem.EmailBackend.send_messages
+
+        def fail_second_send(backend, messages):
+            if len(mailoutbox) == 1:
+                raise SMTPException("mailbox unavailable")
+            return send_messages(backend, messages)
+
+        monkeypatch.setattr(locmem.EmailBackend, "send_messages", fail_second_send)
+        with pytest.raises(SMTPException):
+            tasks.send_order_confirmations()
+        monkeypatch.setattr(locmem.EmailBackend, "send_messages", send_messages)
+        tasks.send_order_confirmations()
+
+        assert [message.to[0] for message in mailoutbox] == [
+            f"customer-{n}@example.com" for n in range(3)
+        ]
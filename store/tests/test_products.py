@@ -0,0 +1,334 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from store.admin import ProductAdmin
+from store.models import Collection, Product, ProductFacet, ProductImage
+from store.serializers import FastProductSerializer, ProductSerializer
+from store.singleflight import StaleCopy
+
+
+@pytest.mark.django_db
+class TestProductCache:
+    def test_retrieve_is_served_from_cache(self, api_client):
+        product = baker.make(Product)
+        api_client.get(f"/api/store/products/{product.id}/")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(f"/api/store/products/{product.id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["id"] == product.id
+        assert len(queries) == 0
+
+    def test_saving_product_invalidates_detail(
+        self, api_client, django_capture_on_commit_callbacks
+    ):
+        product = baker.make(Product, title="a")
+        api_client.get(f"/api/store/products/{product.id}/")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product.title = "b"
+            product.save()
+        response = api_client.get(f"/api/store/products/{product.id}/")
+
+        assert response.data["title"] == "b"
+
+    def test_invalidation_waits_for_the_commit(
+        self, api_client, django_capture_on_commit_callbacks
+    ):
+        product = baker.make(Product, title="a")
+        url = f"/api/store/products/{product.id}/"
+        api_client.get(url)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            product.title = "b"
+            product.save()
+            # still inside the writer's transaction
+            before_commit = api_client.get(url)
+        for callback in callbacks:
+            callback()
+        after_commit = api_client.get(url)
+
+        assert before_commit.data["title"] == "a"
+        assert after_commit.data["title"] == "b"
+
+    def test_clearing_inventory_in_the_admin_invalidates_reads(
+        self, api_client, django_capture_on_commit_callbacks, monkeypatch
+    ):
+        product = baker.make(Product, inventory=5)
+        detail = f"/api/store/products/{product.id}/"
+        listing = f"/api/store/products/?collection_id={product.collection_id}"
+        api_client.get(detail)
+        api_client.get(listing)
+        product_admin = ProductAdmin(Product, admin.site)
+        monkeypatch.setattr(product_admin, "message_user", lambda *args: None)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product_admin.clear_inventory(None, Product.objects.filter(pk=product.pk))
+
+        assert api_client.get(detail).data["inventory"] == 0
+        assert api_client.get(listing).data["results"][0]["inventory"] == 0
+
+    def test_moving_product_invalidates_both_collections(
+        self, api_client, django_capture_on_commit_callbacks
+    ):
+        source, target = baker.make(Collection, _quantity=2)
+        product = baker.make(Product, collection=source)
+        api_client.get(f"/api/store/products/?collection_id={source.id}")
+        api_client.get(f"/api/store/products/?collection_id={target.id}")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product.collection = target
+            product.save()
+        source_response = api_client.get(
+            f"/api/store/products/?collection_id={source.id}"
+        )
+        target_response = api_client.get(
+            f"/api/store/products/?collection_id={target.id}"
+        )
+
+        assert source_response.data["count"] == 0
+        assert target_response.data["count"] == 1
+
+
+@pytest.mark.django_db
+class TestProductKeysetPagination:
+    def walk(self, api_client, url):
+        ids = []
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            ids += [product["id"] for product in response.data["results"]]
+            url = response.data["next"]
+        return ids
+
+    def test_pages_cover_every_product_once_with_ties(self, api_client):
+        products = baker.make(Product, unit_price=5, _quantity=25)
+        expected = [product.id for product in sorted(products, key=lambda p: p.id)]
+
+        ids = self.walk(api_client, "/api/store/products/?ordering=unit_price&cursor=")
+        latest_first = self.walk(api_client, "/api/store/products/?cursor=")
+
+        assert ids == expected
+        assert sorted(latest_first) == expected
+
+    def test_previous_returns_the_page_before(self, api_client):
+        baker.make(Product, _quantity=25)
+        first = api_client.get("/api/store/products/?ordering=-title&cursor=")
+        second = api_client.get(first.data["next"])
+
+        previous = api_client.get(second.data["previous"])
+
+        assert previous.data["results"] == first.data["results"]
+        assert "count" not in first.data
+
+    def test_invalid_cursor_returns_404(self, api_client):
+        response = api_client.get("/api/store/products/?cursor=bogus")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestProductSearch:
+    def test_ranks_title_matches_first(self, api_client):
+        in_description = baker.make(
+            Product, title="Plain mug", description="a large kettle"
+        )
+        in_title = baker.make(Product, title="Kettle", description="steel")
+        baker.make(Product, title="Teapot", description="ceramic")
+
+        response = api_client.get("/api/store/products/?search=kett")
+
+        ids = [product["id"] for product in response.data["results"]]
+        assert ids == [in_title.id, in_description.id]
+
+    def test_index_follows_product_updates(self, api_client):
+        product = baker.make(Product, title="Kettle")
+        product.title = "Teapot"
+        product.save()
+
+        response = api_client.get("/api/store/products/autocomplete/?q=tea")
+
+        assert response.data == [{"id": product.id, "title": "Teapot"}]
+
+
+@pytest.mark.django_db
+class TestProductFacets:
+    def facet_cells(self):
+        return set(
+            ProductFacet.objects.values_list(
+                "collection_id", "price_bucket", "product_count"
+            )
+        )
+
+    def test_each_facet_ignores_its_own_filter(self, api_client):
+        mugs, lamps = baker.make(Collection, _quantity=2)
+        baker.make(Product, collection=mugs, unit_price=Decimal("5"))
+        baker.make(Product, collection=mugs, unit_price=Decimal("30"))
+        baker.make(Product, collection=lamps, unit_price=Decimal("40"))
+        baker.make(Product, collection=lamps, unit_price=Decimal("120"))
+
+        response = api_client.get(
+            "/api/store/products/facets/"
+            f"?collection_id={mugs.id}&unit_price__gt=20&unit_price__lt=45"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        counts = {row["id"]: row["count"] for row in response.data["collections"]}
+        assert counts == {mugs.id: 1, lamps.id: 1}
+        buckets = {row["min"]: row["count"] for row in response.data["price_buckets"]}
+        assert buckets[0] == 1
+        assert buckets[25] == 1
+        assert buckets[100] == 0
+
+    def test_signals_keep_the_table_in_step_with_products(self):
+        source, target = baker.make(Collection, _quantity=2)
+        moved, repriced, deleted = baker.make(
+            Product, collection=source, unit_price=Decimal("15"), _quantity=3
+        )
+
+        moved.collection = target
+        moved.save()
+        repriced.unit_price = Decimal("600")
+        repriced.save()
+        deleted.delete()
+        maintained = self.facet_cells()
+        ProductFacet.objects.rebuild()
+
+        # emptied cells stay behind as zeros until the next rebuild
+        assert maintained - {(source.id, 1, 0)} == self.facet_cells()
+
+    def test_search_is_counted_live(self, api_client):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, title="Kettle", unit_price=10)
+        baker.make(Product, collection=collection, title="Teapot", unit_price=10)
+
+        response = api_client.get("/api/store/products/facets/?search=kett")
+
+        assert response.data["collections"] == [
+            {"id": collection.id, "title": collection.title, "count": 1}
+        ]
+
+    def test_invalid_filter_returns_400(self, api_client):
+        response = api_client.get("/api/store/products/facets/?unit_price__gt=x")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestFastProductSerializer:
+    def test_renders_the_same_json_as_product_serializer(self):
+        products = baker.make(Product, unit_price=Decimal("12.34"), _quantity=3)
+        baker.make(ProductImage, product=products[0], image="store/images/a.jpg")
+        baker.make(ProductImage, product=products[0], image="store/images/b.jpg")
+        request = APIRequestFactory().get("/api/store/products/")
+        context = {"request": request}
+
+        models = Product.objects.order_by("id").prefetch_related("images")
+        rows = Product.objects.order_by("id").values(
+            *FastProductSerializer.values_fields
+        )
+
+        renderer = JSONRenderer()
+        assert renderer.render(
+            FastProductSerializer(rows, many=True, context=context).data
+        ) == renderer.render(ProductSerializer(models, many=True, context=context).data)
+        assert renderer.render(
+            FastProductSerializer(rows[0], context=context).data
+        ) == renderer.render(ProductSerializer(models[0], context=context).data)
+
+
+@pytest.mark.django_db
+class TestProductConditionalGet:
+    def test_matching_etag_returns_304_without_serializing(self, api_client):
+        product = baker.make(Product)
+        url = f"/api/store/products/{product.id}/"
+        etag = api_client.get(url)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert not response.content
+        assert len(queries) == 0
+
+    def test_stale_copy_is_sent_without_validators(self, api_client, monkeypatch):
+        product = baker.make(Product)
+        # another worker holds the lock and the old rendering is all there is
+        monkeypatch.setattr(
+            "store.caching.get_or_compute",
+            lambda *args, **kwargs: StaleCopy({"id": product.id, "title": "old"}),
+        )
+
+        response = api_client.get(f"/api/store/products/{product.id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["title"] == "old"
+        assert not response.has_header("ETag")
+        assert not response.has_header("Last-Modified")
+        assert "no-store" in response["Cache-Control"]
+
+    def test_adding_an_image_changes_the_etag(
+        self, api_client, django_capture_on_commit_callbacks
+    ):
+        product = baker.make(Product)
+        url = f"/api/store/products/{product.id}/"
+        etag = api_client.get(url)["ETag"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(ProductImage, product=product)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert len(response.data["images"]) == 1
+
+    def test_deleting_a_product_moves_the_list_validators(
+        self, api_client, django_capture_on_commit_callbacks, monkeypatch
+    ):
+        kept, deleted = baker.make(Product, _quantity=2)
+        url = "/api/store/products/"
+        response = api_client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        later = timezone.now() + timedelta(minutes=1)
+        monkeypatch.setattr(timezone, "now", lambda: later)
+        # the remaining rows are unchanged, so only the version can tell
+        with django_capture_on_commit_callbacks(execute=True):
+            deleted.delete()
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert response["Last-Modified"] == http_date(later.timestamp())
+        assert [product["id"] for product in response.data["results"]] == [kept.id]
+
+    def test_list_validators_hold_while_nothing_changes(self, api_client, monkeypatch):
+        baker.make(Product)
+        url = "/api/store/products/"
+        response = api_client.get(url)
+        # a day later every cached response has expired, with no write since
+        later = timezone.now() + timedelta(days=1)
+        monkeypatch.setattr(timezone, "now", lambda: later)
+        monkeypatch.setattr(time, "time", lambda: later.timestamp())
+
+        revalidated = api_client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response["ETag"],
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        )
+
+        assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+        assert revalidated["Last-Modified"] == response["Last-Modified"]
@@ -0,0 +1,56 @@
+import threading
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+
+from store.profiling import Sampler, load_stacks, save_stacks
+
+
+def spin(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+class TestSampler:
+    def test_collects_collapsed_stacks_of_the_registered_thread(self):
+        sampler = Sampler(interval=0.001)
+        sampler.start(threading.get_ident())
+        spin(0.1)
+        stacks = sampler.stop(threading.get_ident())
+
+        assert sum(stacks.values()) > 0
+        assert any(stack.endswith("test_profiling.spin") for stack in stacks)
+
+
+class TestDumpProfiles:
+    def test_writes_folded_stacks_with_the_route_as_root(self):
+        save_stacks("product-list", {"a;b": 2})
+        save_stacks("product-list", {"a;b": 1, "a;c": 1})
+        output = StringIO()
+
+        call_command("dump_profiles", "--clear", stdout=output)
+
+        assert output.getvalue().splitlines() == [
+            "product-list;a;b 3",
+            "product-list;a;c 1",
+        ]
+        assert load_stacks() == {}
+
+
+@pytest.mark.django_db
+class TestSamplingProfilerMiddleware:
+    def test_profiles_requests_carrying_the_token(self, api_client, settings):
+        settings.MIDDLEWARE = [
+            "store.middleware.SamplingProfilerMiddleware",
+            *settings.MIDDLEWARE,
+        ]
+        settings.PROFILER_TOKEN = "secret"
+
+        response = api_client.get("/api/store/products/", HTTP_X_PROFILE="secret")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.wsgi_request.profiled_route == "product-list"
@@ -0,0 +1,125 @@
+"""
+Query budgets for every route in ``store.urls``.
+
+Each route is requested against a catalog with several rows per relation,
+so an N+1 regression pushes the count past its budget. A new route fails
+``test_every_route_has_a_budget`` until it is added to ``QUERY_BUDGETS``.
+"""
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+
+from store.models import (
+    Cart,
+    CartItem,
+    Collection,
+    Order,
+    OrderItem,
+    Product,
+    ProductImage,
+    Review,
+)
+
+ROWS = 5
+
+# route name -> maximum queries for a GET, or None for routes without one
+QUERY_BUDGETS = {
+    "product-list": 4,
+    "product-detail": 3,
+    "product-autocomplete": 1,
+    "product-facets": 3,
+    "product-import": None,
+    "product-export": 1,
+    "product-reviews-list": 2,
+    "product-reviews-detail": 2,
+    "product-images-list": 2,
+    "product-images-detail": 2,
+    "collection-list": 2,
+    "collection-detail": 2,
+    "cart-list": None,
+    "cart-detail": 2,
+    "cart-items-list": 1,
+    "cart-items-detail": 1,
+    "cart-items-batch": None,
+    "customer-list": 1,
+    "customer-detail": 1,
+    "customer-me": 1,
+    "orders-list": 2,
+    "orders-detail": 2,
+    "async-product-list": 3,
+    "async-product-detail": 2,
+    "async-product-reviews-list": 1,
+    "async-collection-list": 1,
+    "async-collection-detail": 1,
+    "async-cart-detail": 2,
+}
+
+
+@pytest.fixture
+def catalog():
+    user = baker.make(get_user_model(), is_staff=True)
+    collection = baker.make(Collection)
+    products = baker.make(Product, collection=collection, _quantity=ROWS)
+    for product in products:
+        baker.make(ProductImage, product=product, _quantity=2)
+        baker.make(Review, product=product, _quantity=2)
+    cart = baker.make(Cart)
+    for product in products:
+        baker.make(CartItem, cart=cart, product=product, quantity=1)
+    orders = baker.make(Order, customer=user.customer, _quantity=ROWS)
+    for order in orders:
+        for product in products:
+            baker.make(OrderItem, order=order, product=product, quantity=1)
+    product = products[0]
+    return {
+        "user": user,
+        "kwargs": {
+            "product-detail": {"id": product.id},
+            "product-reviews-list": {"product_id": product.id},
+            "product-reviews-detail": {
+                "product_id": product.id,
+                "id": product.reviews.first().id,
+            },
+            "product-images-list": {"product_id": product.id},
+            "product-images-detail": {
+                "product_id": product.id,
+                "pk": product.images.first().id,
+            },
+            "collection-detail": {"pk": collection.id},
+            "cart-detail": {"id": cart.id},
+            "cart-items-list": {"cart_id": cart.id},
+            "cart-items-detail": {"cart_id": cart.id, "id": cart.items.first().id},
+            "customer-detail": {"pk": user.customer.id},
+            "orders-detail": {"pk": orders[0].id},
+            "async-product-detail": {"id": product.id},
+            "async-product-reviews-list": {"product_id": product.id},
+            "async-collection-detail": {"pk": collection.id},
+            "async-cart-detail": {"id": cart.id},
+        },
+    }
+
+
+def test_every_route_has_a_budget(store_route_names):
+    assert store_route_names <= set(QUERY_BUDGETS)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "route,budget",
+    [(route, budget) for route, budget in QUERY_BUDGETS.items() if budget],
+)
+def test_route_stays_within_query_budget(
+    route, budget, catalog, api_client, django_assert_max_num_queries
+):
+    api_client.force_authenticate(user=catalog["user"])
+    url = reverse(route, kwargs=catalog["kwargs"].get(route, {}))
+    if route == "product-autocomplete":
+        url += "?q=a"
+
+    with django_assert_max_num_queries(budget):
+        response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
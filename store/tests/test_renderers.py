@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import msgpack
+import pytest
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from store.models import Cart, CartItem
+from store.renderers import ORJSONRenderer
+
+
+class TestORJSONRenderer:
+    def test_output_matches_json_renderer(self):
+        data = {
+            "id": uuid4(),
+            "price": Decimal("19.99"),
+            "placed_at": datetime(2024, 5, 1, 12, 30, 45, 123456, tzinfo=timezone.utc),
+            "title": "Café \u2028",
+            "items": [{"quantity": 2, "total": Decimal("0.30")}],
+            "missing": None,
+        }
+
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+class TestMessagePack:
+    def test_cart_can_be_retrieved_as_msgpack(self, api_client):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product__unit_price="19.99", quantity=2)
+
+        response = api_client.get(
+            f"/api/store/carts/{cart.id}/", HTTP_ACCEPT="application/msgpack"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/msgpack"
+        data = msgpack.unpackb(response.content)
+        assert data["id"] == str(cart.id)
+        assert data["total_price"] == 39.98
+
+    def test_cart_item_can_be_posted_as_msgpack(self, api_client):
+        cart = baker.make(Cart)
+        product = baker.make(CartItem).product
+
+        response = api_client.post(
+            f"/api/store/carts/{cart.id}/items/",
+            msgpack.packb({"product_id": product.id, "quantity": 3}),
+            content_type="application/msgpack",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert CartItem.objects.get(cart=cart, product=product).quantity == 3
+
+    def test_malformed_body_returns_400(self, api_client):
+        cart = baker.make(Cart)
+
+        response = api_client.post(
+            f"/api/store/carts/{cart.id}/items/",
+            b"\xc1",
+            content_type="application/msgpack",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
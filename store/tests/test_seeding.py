@@ -0,0 +1,31 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from store import seeding
+from store.models import Cart, CartItem, Collection, Order, Product, ProductFacet
+
+
+@pytest.mark.django_db
+def test_unseed_deletes_seeded_rows_in_bulk():
+    kept = baker.make(Product, unit_price=5)
+    seeding.seed(products=200, collections=3, customers=10, carts=10, orders=10)
+    # a real cart holding a seeded product next to a real one
+    cart = baker.make(Cart)
+    baker.make(CartItem, cart=cart, product=kept)
+    baker.make(CartItem, cart=cart, product=Product.objects.exclude(pk=kept.pk)[0])
+
+    with CaptureQueriesContext(connection) as queries:
+        seeding.unseed()
+
+    assert list(Product.objects.all()) == [kept]
+    assert list(Collection.objects.all()) == [kept.collection]
+    assert not Order.objects.exists()
+    assert list(Cart.objects.all()) == [cart]
+    assert list(CartItem.objects.values_list("product_id", flat=True)) == [kept.pk]
+    assert list(ProductFacet.objects.values_list("collection_id", "product_count")) == [
+        (kept.collection_id, 1)
+    ]
+    # independent of how many rows were seeded
+    assert len(queries) < 50
@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+
+from store.singleflight import (
+    StaleCopy,
+    acquire,
+    get_or_compute,
+    release,
+    single_flight,
+)
+
+
+class SlowCompute:
+    def __init__(self, value="fresh", delay=0.2):
+        self.calls = 0
+        self.value = value
+        self.delay = delay
+        self.guard = threading.Lock()
+
+    def __call__(self):
+        with self.guard:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+def run_concurrently(func, workers=10):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda _: func(), range(workers)))
+
+
+class TestGetOrCompute:
+    def test_concurrent_misses_compute_once(self):
+        compute = SlowCompute()
+
+        results = run_concurrently(lambda: get_or_compute("hot", compute, 60))
+
+        assert results == ["fresh"] * 10
+        assert compute.calls == 1
+        assert cache.get("hot") == "fresh"
+
+    def test_waiters_get_the_stale_copy_while_it_recomputes(self):
+        cache.set("hot:stale", "stale")
+        compute = SlowCompute()
+
+        results = run_concurrently(
+            lambda: get_or_compute("hot", compute, 60, stale_key="hot:stale")
+        )
+
+        assert sorted(results) == ["fresh"] + ["stale"] * 9
+        assert compute.calls == 1
+        assert cache.get("hot:stale") == "fresh"
+
+    def test_marks_the_stale_copy_when_asked(self):
+        cache.set("hot:stale", "stale")
+        lock = acquire("hot:lock")
+        try:
+            value = get_or_compute(
+                "hot", SlowCompute(), 60, stale_key="hot:stale", mark_stale=True
+            )
+        finally:
+            release(lock)
+
+        assert isinstance(value, StaleCopy)
+        assert value.value == "stale"
+
+    def test_none_is_not_cached(self):
+        get_or_compute("missing", lambda: None, 60)
+
+        assert get_or_compute("missing", lambda: "found", 60) == "found"
+
+
+class TestSingleFlightDecorator:
+    def test_wraps_plain_functions(self):
+        compute = SlowCompute()
+
+        @single_flight(key=lambda product_id: f"product:{product_id}", timeout=60)
+        def load(product_id):
+            return compute()
+
+        assert run_concurrently(lambda: load(1)) == ["fresh"] * 10
+        assert compute.calls == 1
@@ -0,0 +1,130 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework import status
+
+from store.models import Collection, Product
+from store.tiered_cache import MISSING, LocalCache, TieredCache
+
+
+class TestLocalCache:
+    def test_evicts_the_least_recently_used_entry(self):
+        local = LocalCache(max_entries=2, timeout=60)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+
+        assert local.get("a") == 1
+        assert local.get("b") is MISSING
+        assert local.get("c") == 3
+
+    def test_expired_entries_are_missing(self):
+        local = LocalCache(max_entries=2, timeout=-1)
+        local.set("a", 1)
+
+        assert local.get("a") is MISSING
+
+
+class TestTieredCache:
+    def test_counts_hits_and_misses_per_tier(self):
+        tiered = TieredCache("test")
+        loads = []
+
+        def load():
+            loads.append(1)
+            return "value"
+
+        tiered.get_or_set("key", load)
+        tiered.get_or_set("key", load)
+        tiered.clear()
+        tiered.get_or_set("key", load)
+
+        assert loads == [1]
+        assert tiered.stats() == {
+            "l1": {"hits": 1, "misses": 2, "entries": 1},
+            "l2": {"hits": 1, "misses": 1},
+        }
+
+    @pytest.mark.django_db
+    def test_delete_drops_both_tiers(self, django_capture_on_commit_callbacks):
+        tiered = TieredCache("test")
+        tiered.get_or_set("key", lambda: "old")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tiered.delete("key")
+
+        assert tiered.get_or_set("key", lambda: "new") == "new"
+
+    @pytest.mark.django_db
+    def test_delete_waits_for_the_commit(self, django_capture_on_commit_callbacks):
+        tiered = TieredCache("test")
+        tiered.get_or_set("key", lambda: "old")
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            tiered.delete("key")
+            before_commit = tiered.get_or_set("key", lambda: "new")
+        for callback in callbacks:
+            callback()
+
+        assert before_commit == "old"
+        assert tiered.get_or_set("key", lambda: "new") == "new"
+
+    def test_load_overtaken_by_a_commit_is_not_cached(self):
+        tiered = TieredCache("test")
+
+        def load_then_writer_commits():
+            # the rows were read, then a writer committed and deleted the key
+            tiered.delete_now(["key"])
+            return "old"
+
+        assert tiered.get_or_set("key", load_then_writer_commits) == "old"
+        assert cache.get(tiered.l2_key("key")) is None
+        assert tiered.get_or_set("key", lambda: "new") == "new"
+
+
+@pytest.mark.django_db
+class TestCachedCollections:
+    def test_warm_reads_do_not_query(self, api_client):
+        collection = baker.make(Collection)
+        api_client.get("/api/store/collections/")
+
+        with CaptureQueriesContext(connection) as queries:
+            list_response = api_client.get("/api/store/collections/")
+            detail_response = api_client.get(f"/api/store/collections/{collection.id}/")
+
+        assert list_response.status_code == status.HTTP_200_OK
+        assert detail_response.data["id"] == collection.id
+        assert len(queries) == 0
+
+    def test_product_changes_refresh_the_count(
+        self, api_client, django_capture_on_commit_callbacks
+    ):
+        collection = baker.make(Collection)
+        api_client.get(f"/api/store/collections/{collection.id}/")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            baker.make(Product, collection=collection)
+        response = api_client.get(f"/api/store/collections/{collection.id}/")
+
+        assert response.data["product_count"] == 1
+
+    def test_product_with_unknown_collection_returns_400(self, api_client):
+        api_client.force_authenticate(user=baker.make(get_user_model(), is_staff=True))
+
+        response = api_client.post(
+            "/api/store/products/",
+            {
+                "title": "a",
+                "slug": "a",
+                "inventory": 1,
+                "unit_price": 1,
+                "collection": 0,
+            },
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["collection"] is not None
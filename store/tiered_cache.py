@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from store.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class LocalCache:
+    """
+    Bounded, thread-safe LRU with a per-entry TTL.
+    """
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def get_redis_connection():
+    try:
+        from django_redis import get_redis_connection
+    except ImportError:
+        return None
+    try:
+        return get_redis_connection("default")
+    except NotImplementedError:
+        # not a django_redis cache, e.g. locmem in tests
+        return None
+
+
+class TieredCache:
+    """
+    Per-process L1 in front of the shared ``django.core.cache`` L2 for small,
+    rarely changing reference data.
+
+    ``delete`` waits for the surrounding transaction to commit, then
+    publishes the keys on a Redis channel that every process listens to, so
+    their L1 copies go too. Pub/sub is fire-and-forget; the
+    L1 timeout bounds how long a lost message can leave a stale copy.
+
+    A delete also bumps a per-key generation. A load that sees the
+    generation move while it ran drops what it wrote to L2, since it may
+    have read the rows before the writer committed.
+    """
+
+    def __init__(self, name, max_entries=256, l1_timeout=60, l2_timeout=15 * 60):
+        self.name = name
+        self.channel = f"store:tiered:{name}"
+        self.local = LocalCache(max_entries, l1_timeout)
+        self.l2_timeout = l2_timeout
+        self.counters = Counter()
+        self.listener_pid = None
+        self.listener_lock = threading.Lock()
+
+    def l2_key(self, key):
+        return f"store:tiered:{self.name}:{key}"
+
+    def generation_key(self, key):
+        return f"store:tiered:{self.name}:{key}:generation"
+
+    def get_or_set(self, key, default):
+        """
+        Returns the value for ``key`` from L1, then L2, then ``default()``,
+        filling the tiers it missed.
+        """
+        self.ensure_listener()
+        value = self.local.get(key)
+        self.record("l1", value is not MISSING)
+        if value is not MISSING:
+            return value
+
+        value = cache.get(self.l2_key(key), MISSING)
+        self.record("l2", value is not MISSING)
+        if value is not MISSING:
+            self.local.set(key, value)
+            return value
+
+        generation = cache.get(self.generation_key(key), 0)
+        value = default()
+        cache.set(self.l2_key(key), value, self.l2_timeout)
+        # checked after the write, so a delete landing on either side of it
+        # is seen: the rows may have been read before that writer committed
+        if cache.get(self.generation_key(key), 0) != generation:
+            cache.delete(self.l2_key(key))
+        else:
+            self.local.set(key, value)
+        return value
+
+    def record(self, tier, hit):
+        self.counters[tier, hit] += 1
+        record_cache(self.name, tier, hit)
+
+    def delete(self, *keys):
+        # after the writer commits, or a concurrent read could put the old
+        # value back into L2 (and from there every L1) until it times out
+        transaction.on_commit(partial(self.delete_now, keys))
+
+    def delete_now(self, keys):
+        for key in keys:
+            generation_key = self.generation_key(key)
+            if not cache.add(generation_key, 1, None):
+                try:
+                    cache.incr(generation_key)
+                except ValueError:
+                    # evicted in between; any other value still differs
+                    cache.set(generation_key, 1, None)
+        self.local.delete(*keys)
+        cache.delete_many([self.l2_key(key) for key in keys])
+        connection = get_redis_connection()
+        if connection is not None:
+            try:
+                connection.publish(self.channel, json.dumps(keys))
+            except RedisError:
+                logger.warning("could not broadcast %s invalidation", self.name)
+
+    def clear(self):
+        """
+        Empties this process's L1 only.
+        """
+        self.local.clear()
+
+    def stats(self):
+        return {
+            "l1": {
+                "hits": self.counters["l1", True],
+                "misses": self.counters["l1", False],
+                "entries": len(self.local.entries),
+            },
+            "l2": {
+                "hits": self.counters["l2", True],
+                "misses": self.counters["l2", False],
+            },
+        }
+
+    def ensure_listener(self):
+        # started lazily and per pid, so forked gunicorn workers get their own
+        if self.listener_pid == os.getpid():
+            return
+        with self.listener_lock:
+            if self.listener_pid == os.getpid():
+                return
+            self.listener_pid = os.getpid()
+            connection = get_redis_connection()
+            if connection is None:
+                return
+            threading.Thread(
+                target=self.listen,
+                args=(connection,),
+                name=f"tiered-cache-{self.name}",
+                daemon=True,
+            ).start()
+
+    def listen(self, connection):
+        while True:
+            try:
+                pubsub = connection.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # anything published while we were away is lost, so start over
+                self.local.clear()
+                for message in pubsub.listen():
+                    self.local.delete(*json.loads(message["data"]))
+            except RedisError:
+                logger.warning("lost the %s invalidation channel", self.name)
+                time.sleep(1)
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework_nested import routers
 
-from . import views
+from . import async_views, views
 
 router = routers.DefaultRouter()
 router.register("products", views.ProductViewSet)
@@ -21,6 +21,29 @@ urlpatterns = [
     path("", include(router.urls)),
     path("", include(product_router.urls)),
     path("", include(cart_router.urls)),
+    # async read paths for ASGI deployments, see storefront/asgi.py
+    path("async/products/", async_views.product_list, name="async-product-list"),
+    path(
+        "async/products/<int:id>/",
+        async_views.product_detail,
+        name="async-product-detail",
+    ),
+    path(
+        "async/products/<int:product_id>/reviews/",
+        async_views.review_list,
+        name="async-product-reviews-list",
+    ),
+    path(
+        "async/collections/",
+        async_views.collection_list,
+        name="async-collection-list",
+    ),
+    path(
+        "async/collections/<int:pk>/",
+        async_views.collection_detail,
+        name="async-collection-detail",
+    ),
+    path("async/carts/<uuid:id>/", async_views.cart_detail, name="async-cart-detail"),
     # other paths
     # path("products/", views.ProductList.as_view()),
     # path("products/<int:pk>/", views.ProductDetail.as_view(), name="product_detail"),
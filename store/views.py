@@ -1,10 +1,23 @@
-from django.db.models import Count
-from django.http import HttpResponse
+import codecs
+from decimal import Decimal
+
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Prefetch,
+    Sum,
+    Value,
+)
+from django.db.models.deletion import ProtectedError
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_list_or_404, get_object_or_404, render
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action, api_view
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.mixins import (
@@ -19,9 +32,27 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
-from store.filters import ProductFilter
+from store import catalog
+from store.caching import (
+    CACHE_TIMEOUT,
+    CATALOG,
+    ConditionalGetMixin,
+    VersionedCacheMixin,
+    autocomplete_key,
+    facets_key,
+    get_collections,
+    product_detail_key,
+    product_detail_stale_key,
+    product_list_key,
+    product_list_scope,
+    product_scope,
+)
+from store.facets import product_facets
+from store.filters import ProductFilter, ProductSearchFilter
 from store.pagination import ProductPagination
 from store.permissions import FullDjangoModelPermission, IsAdminOrReadOnly
+from store.search import search_products
+from store.singleflight import single_flight
 
 from .models import (
     Cart,
@@ -36,11 +67,14 @@ from .models import (
 )
 from .serializers import (
     AddCartItemSerializer,
+    BatchCartItemSerializer,
     CartItemSerializer,
     CartSerializer,
     CollectionSerializer,
     CreateOrderSerializer,
     CustomerSerializer,
+    FastProductSerializer,
+    OutOfStock,
     OrderItemSerializer,
     OrderSerializer,
     ProductImageSerializer,
@@ -51,11 +85,35 @@ from .serializers import (
 )
 
 
+# totals are computed by the database so large carts are not multiplied out
+# row by row in Python; the output field keeps them exact Decimals
+TOTAL_PRICE_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+def cart_items_with_totals():
+    return CartItem.objects.select_related("product").annotate(
+        total_price=ExpressionWrapper(
+            F("quantity") * F("product__unit_price"), output_field=TOTAL_PRICE_FIELD
+        )
+    )
+
+
 class CartViewSet(
     CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet
 ):
     lookup_field = "id"
-    queryset = Cart.objects.prefetch_related("items__product").all()
+    queryset = Cart.objects.prefetch_related(
+        Prefetch("items", queryset=cart_items_with_totals())
+    ).annotate(
+        total_price=Coalesce(
+            Sum(
+                F("items__quantity") * F("items__product__unit_price"),
+                output_field=TOTAL_PRICE_FIELD,
+            ),
+            Value(Decimal(0)),
+            output_field=TOTAL_PRICE_FIELD,
+        )
+    )
     serializer_class = CartSerializer
 
 
@@ -64,6 +122,8 @@ class CartItemViewSet(ModelViewSet):
     http_method_names = ["get", "post", "patch", "delete"]
 
     def get_serializer_class(self):
+        if self.action == "batch":
+            return BatchCartItemSerializer
         if self.request.method == "POST":
             return AddCartItemSerializer
         elif self.request.method == "PATCH":
@@ -71,58 +131,196 @@ class CartItemViewSet(ModelViewSet):
         return CartItemSerializer
 
     def get_serializer_context(self):
-        return {"cart_id": self.kwargs["cart_pk"]}
+        return {"cart_id": self.kwargs["cart_id"]}
 
     def get_queryset(self):
-        return CartItem.objects.select_related("product").filter(
-            cart_id=self.kwargs["cart_pk"]
-        )
+        return cart_items_with_totals().filter(cart_id=self.kwargs["cart_id"])
 
+    @action(detail=False, methods=["post"])
+    def batch(self, request, *args, **kwargs):
+        # lets the guest cart merge and reorder flows send every change at once
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        items = CartItemSerializer(self.get_queryset(), many=True)
+        return Response(items.data)
 
-class ReviewViewSet(ModelViewSet):
+
+class ReviewViewSet(ConditionalGetMixin, ModelViewSet):
     lookup_field = "id"
 
     def get_queryset(self):
-        return Review.objects.filter(product_id=self.kwargs["product_pk"])
+        return Review.objects.filter(product_id=self.kwargs["product_id"])
 
     serializer_class = ReviewSerializer
 
     def get_serializer_context(self):
-        return {"product_id": self.kwargs["product_pk"]}
+        return {"product_id": self.kwargs["product_id"]}
 
 
-class ProductImageViewSet(ModelViewSet):
+class ProductImageViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = ProductImageSerializer
+    # image changes touch the product, see touch_product_for_image
+    last_modified_field = "product__last_update"
+
+    def get_list_version_scope(self, request):
+        product_id = self.kwargs.get("product_id")
+        return None if product_id is None else product_scope(product_id)
 
     def get_queryset(self):
-        product_pk = self.kwargs.get("product_pk")
-        if product_pk is None:
+        product_id = self.kwargs.get("product_id")
+        if product_id is None:
             return ProductImage.objects.none()
-        return ProductImage.objects.filter(product_id=product_pk)
+        return ProductImage.objects.filter(product_id=product_id)
 
     def get_serializer_context(self):
-        return {"product_id": self.kwargs["product_pk"]}
+        return {"product_id": self.kwargs["product_id"]}
 
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, VersionedCacheMixin, ModelViewSet):
     # throttle_scope = "products"
     lookup_field = "id"
     permission_classes = [IsAdminOrReadOnly]
     pagination_class = ProductPagination
-    queryset = Product.objects.order_by("-last_update").prefetch_related("images").all()
+    queryset = Product.objects.order_by("-last_update").prefetch_related(
+        Prefetch("images", queryset=ProductImage.objects.order_by("id"))
+    )
     serializer_class = ProductSerializer
     filter_backends = [
         DjangoFilterBackend,
-        SearchFilter,
+        ProductSearchFilter,
         OrderingFilter,
     ]
     filterset_class = ProductFilter
     search_fields = ["title", "description"]
     ordering_fields = ["unit_price", "last_update", "title"]
 
+    def get_queryset(self):
+        # reads go through plain rows and the fast serializer
+        if self.action in ("list", "retrieve"):
+            return Product.objects.order_by("-last_update").values(
+                *FastProductSerializer.values_fields
+            )
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.action in ("list", "retrieve"):
+            return FastProductSerializer
+        return ProductSerializer
+
     def get_serializer_context(self):
         return {"request": self.request}
 
+    def get_list_cache_key(self, request):
+        return product_list_key(request)
+
+    def get_detail_cache_key(self, request, *args, **kwargs):
+        return product_detail_key(request, kwargs["id"])
+
+    def get_detail_stale_cache_key(self, request, *args, **kwargs):
+        return product_detail_stale_key(request, kwargs["id"])
+
+    def get_list_version_scope(self, request):
+        return product_list_scope(request)
+
+    def get_detail_validator_state(self, request, *args, **kwargs):
+        return self.cached_validator_state(
+            self.get_detail_cache_key(request, *args, **kwargs),
+            super().get_detail_validator_state,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    @action(detail=False)
+    @single_flight(
+        key=lambda view, request: autocomplete_key(request), timeout=CACHE_TIMEOUT
+    )
+    def autocomplete(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response([])
+        queryset = Product.objects.all()
+        results = search_products(queryset, query, title_only=True)
+        if results is None:
+            results = queryset.filter(title__istartswith=query)
+        else:
+            results = results.order_by("-search_rank", "-id")
+        return Response(list(results.values("id", "title")[:10]))
+
+    @action(detail=False)
+    @single_flight(key=lambda view, request: facets_key(request), timeout=CACHE_TIMEOUT)
+    def facets(self, request):
+        filterset = ProductFilter(request.query_params, queryset=Product.objects.all())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        filters = filterset.form.cleaned_data
+        search_filter = ProductSearchFilter()
+
+        def search(queryset):
+            return search_filter.filter_queryset(request, queryset, self)
+
+        collection = filters.get("collection_id")
+        return Response(
+            product_facets(
+                collection_id=getattr(collection, "pk", collection),
+                price_gt=filters.get("unit_price__gt"),
+                price_lt=filters.get("unit_price__lt"),
+                search=search if search_filter.get_search_terms(request) else None,
+            )
+        )
+
+    def get_catalog_format(self, request):
+        file_format = request.query_params.get("file_format")
+        if file_format is None:
+            content_type = request.content_type.split(";")[0].strip()
+            for candidate, candidate_type in catalog.CONTENT_TYPES.items():
+                if content_type == candidate_type:
+                    file_format = candidate
+        return file_format or catalog.CSV
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        url_name="import",
+        permission_classes=[IsAdminUser],
+    )
+    def import_catalog(self, request):
+        file_format = self.get_catalog_format(request)
+        if file_format not in catalog.FORMATS:
+            return Response(
+                {"error": f"file_format must be one of {', '.join(catalog.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # read the body line by line instead of through request.data so an
+        # upload of any size is never held in memory
+        lines = codecs.iterdecode(request.stream or [], "utf-8")
+        report = catalog.import_products(lines, file_format)
+        return Response(report.as_dict())
+
+    @action(
+        detail=False,
+        url_path="export",
+        url_name="export",
+        permission_classes=[IsAdminUser],
+    )
+    def export_catalog(self, request):
+        file_format = request.query_params.get("file_format", catalog.CSV)
+        if file_format not in catalog.FORMATS:
+            return Response(
+                {"error": f"file_format must be one of {', '.join(catalog.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        response = StreamingHttpResponse(
+            catalog.export_products(file_format),
+            content_type=catalog.CONTENT_TYPES[file_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="products.{file_format}"'
+        )
+        return response
+
     def destroy(self, request, *args, **kwargs):
         if OrderItem.objects.filter(pk=kwargs["pk"]).count() > 0:
             return Response(
@@ -254,25 +452,68 @@ class ProductViewSet(ModelViewSet):
 #         return Response({"error": "Item Deleted"}, status=status.HTTP_204_NO_CONTENT)
 
 
-class CollectionViewSet(ModelViewSet):
-    queryset = Collection.objects.annotate(product_count=Count("product"))
+class CollectionViewSet(ConditionalGetMixin, ModelViewSet):
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [IsAdminOrReadOnly]
 
     def get_serializer_context(self):
         return {"request": self.request}
 
+    # reads are served from the tiered reference cache, writes go to the
+    # database and expire it through the signal handlers
+
+    def get_queryset(self):
+        if self.action == "list":
+            return list(get_collections().values())
+        return super().get_queryset()
+
+    def get_cached_object(self):
+        pk = str(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return get_collections().get(int(pk)) if pk.isdigit() else None
+
+    def get_object(self):
+        if self.action != "retrieve":
+            return super().get_object()
+        collection = self.get_cached_object()
+        if collection is None:
+            raise Http404("No Collection matches the given query.")
+        self.check_object_permissions(self.request, collection)
+        return collection
+
+    def get_validator_state(self, collections):
+        return {
+            "last_modified": max(
+                (collection.last_update for collection in collections), default=None
+            ),
+            "max_id": max((collection.pk for collection in collections), default=None),
+            "count": len(collections),
+        }
+
+    def get_list_version_scope(self, request):
+        # product counts are part of every collection
+        return CATALOG
+
+    def get_detail_validator_state(self, request, *args, **kwargs):
+        collection = self.get_cached_object()
+        return None if collection is None else self.get_validator_state([collection])
+
     def destroy(self, request, *args, **kwargs):
-        collection = (
-            Collection.objects.filter(pk=kwargs["pk"])
-            .annotate(product_count=Count("product"))
-            .first()
-        )
+        collection = Collection.objects.filter(pk=kwargs["pk"]).first()
         if collection and collection.product_count > 0:
             return Response(
                 {"error": "collection cannot be deleted"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if collection:
+            try:
+                collection.delete()
+            except ProtectedError:
+                # the denormalized count drifted; products still reference it
+                return Response(
+                    {"error": "collection cannot be deleted"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
         return Response(
             {"error": "Collection Deleted"}, status=status.HTTP_204_NO_CONTENT
         )
@@ -439,9 +680,15 @@ class OrderViewSet(ModelViewSet):
             data=request.data, context={"user_id": self.request.user.id}
         )
         serializer.is_valid(raise_exception=True)
-        # order is retured from custom save method in CreateOrderSerializer
-        order = serializer.save()
-        serializer = OrderSerializer(order)
+        try:
+            # order is retured from custom save method in CreateOrderSerializer
+            order = serializer.save()
+        except OutOfStock as error:
+            return Response(
+                {"error": str(error), "items": error.shortages},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = OrderSerializer(self.get_order_queryset().get(pk=order.pk))
         return Response(serializer.data)
 
     def get_serializer_class(self):
@@ -451,12 +698,13 @@ class OrderViewSet(ModelViewSet):
             return UpdateOrderSerializer
         return OrderSerializer
 
+    def get_order_queryset(self):
+        return Order.objects.prefetch_related(
+            Prefetch("items", queryset=OrderItem.objects.select_related("product"))
+        )
+
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return Order.objects.all()
-
-        customer = Customer.objects.only("id").filter(user_id=user.id).first()
-        if not customer:
-            return Order.objects.none()
-        return Order.objects.filter(customer_id=customer.id)
+            return self.get_order_queryset()
+        return self.get_order_queryset().filter(customer__user_id=user.id)
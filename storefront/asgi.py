@@ -3,6 +3,19 @@ ASGI config for storefront project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The async read paths under /api/store/async/ only pay off when served from
+here; under WSGI every request to them spins up its own event loop. Run it
+with uvicorn workers managed by gunicorn (the ``web_asgi`` Procfile entry):
+
+    gunicorn --workers=1 --worker-class uvicorn_worker.UvicornWorker \
+        --bind 0.0.0.0:8080 storefront.asgi:application
+
+or with uvicorn alone during development:
+
+    uvicorn storefront.asgi:application --port 8000
+
+locust/compare_servers.sh compares both modes at equal worker counts.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -102,6 +102,7 @@ else:
 if DEBUG and not IS_PRODUCTION:
     # Development middleware
     MIDDLEWARE = [
+        "store.middleware.MetricsMiddleware",
         "corsheaders.middleware.CorsMiddleware",
         "django.middleware.security.SecurityMiddleware",
         "silk.middleware.SilkyMiddleware",
@@ -117,6 +118,7 @@ if DEBUG and not IS_PRODUCTION:
 else:
     # Production middleware
     MIDDLEWARE = [
+        "store.middleware.MetricsMiddleware",
         "django.middleware.security.SecurityMiddleware",
         "whitenoise.middleware.WhiteNoiseMiddleware",
         "corsheaders.middleware.CorsMiddleware",
@@ -163,11 +165,12 @@ if IS_PRODUCTION:
         )
     }
 else:
+    # DATABASE_URL points development, tests and benchmarks at another
+    # database, e.g. a local PostgreSQL
     DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.sqlite3",
-            "NAME": BASE_DIR / "db.sqlite3",
-        }
+        "default": dj_database_url.config(
+            default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"
+        )
     }
 
 # Password validation
@@ -213,6 +216,17 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "store.renderers.ORJSONRenderer",
+        "store.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "store.parsers.ORJSONParser",
+        "store.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 # Djoser
@@ -251,9 +265,29 @@ CELERY_BEAT_SCHEDULE = {
         "task": "playground.tasks.monthly_report",
         "schedule": crontab(day_of_month=1, hour=4, minute=30),
         "args": ["Your monthly report is being generated"],
-    }
+    },
+    # sweeps up orders whose confirmation could not be queued at checkout
+    "order_confirmations": {
+        "task": "store.tasks.send_order_confirmations",
+        "schedule": crontab(minute="*/5"),
+    },
+}
+
+# Bulk customer notifications: recipients per SMTP connection, and how many
+# of those batches one worker may send per second/minute/hour. Point
+# NOTIFICATION_QUEUE at a queue of its own to give campaigns dedicated
+# workers, e.g. `celery -A storefront worker -Q notifications --concurrency 8`
+NOTIFICATION_BATCH_SIZE = env.int("NOTIFICATION_BATCH_SIZE", default=500)
+NOTIFICATION_RATE_LIMIT = env("NOTIFICATION_RATE_LIMIT", default="60/m")
+NOTIFICATION_QUEUE = env("NOTIFICATION_QUEUE", default="celery")
+CELERY_TASK_ROUTES = {
+    "playground.tasks.send_notification_batch": {"queue": NOTIFICATION_QUEUE},
 }
 
+# Order confirmations placed within this many seconds go out in one batch
+ORDER_CONFIRMATION_DELAY = env.int("ORDER_CONFIRMATION_DELAY", default=10)
+ORDER_CONFIRMATION_BATCH_SIZE = env.int("ORDER_CONFIRMATION_BATCH_SIZE", default=100)
+
 # Cache Configuration
 if IS_PRODUCTION:
     REDIS_URL = env("REDIS_URL")
@@ -277,6 +311,25 @@ else:
         }
     }
 
+# Upstream used by the playground hello view; tests point it at a stub server
+HTTPBIN_URL = env("HTTPBIN_URL", default="https://httpbin.org")
+HTTPBIN_TIMEOUT = env.float("HTTPBIN_TIMEOUT", default=5.0)
+
+# Bearer token required on /metrics. Production refuses to start without
+# one; elsewhere it may be left empty to scrape without auth
+if IS_PRODUCTION:
+    METRICS_TOKEN = env("METRICS_TOKEN")
+else:
+    METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+# Sampling profiler, off unless one of these is set: profile 1 in N requests,
+# every request to these route names, or requests sending X-Profile: <token>
+PROFILER_SAMPLE_RATE = env.int("PROFILER_SAMPLE_RATE", default=0)
+PROFILER_ROUTES = env.list("PROFILER_ROUTES", default=[])
+PROFILER_TOKEN = env("PROFILER_TOKEN", default="")
+if PROFILER_SAMPLE_RATE or PROFILER_ROUTES or PROFILER_TOKEN:
+    MIDDLEWARE.insert(1, "store.middleware.SamplingProfilerMiddleware")
+
 # Email Configuration
 if IS_PRODUCTION:
     EMAIL_HOST = env("EMAIL_HOST")
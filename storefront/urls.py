@@ -26,6 +26,8 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 import os
 
+from store.metrics import metrics_view
+
 admin.site.site_header = "Storefront Admin"
 admin.site.site_title = "Admin"
 admin.site.index_title = "Admin Portal"
@@ -74,6 +76,7 @@ urlpatterns = [
     path(
         "api/redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"
     ),
+    path("metrics", metrics_view, name="metrics"),
     # Serve frontend for all other routes except excluded prefixes
     re_path(r"^(?!api/|assets/|static/|media/|__debug__/).*$", TemplateView.as_view(template_name="index.html")),
 ]